@@ -1,8 +1,10 @@
 import copy
 import re
 
-import stanfordnlp
+from preprocessing.sentence_features import sentence_features
 
+from .compiled_question import CompiledQuestion, compile_question
+from .pipeline import get_pipeline
 from .question_processing import find_q_type, find_q_focus
 from .util import (construct_bigrams,
                    sim,
@@ -18,33 +20,64 @@ from .util import (construct_bigrams,
                    reconstruct_sentence,
                    construct_answer_from_idx,
                    calculate_tree_similarity,
+                   tree_similarity_bound,
                    calculate_focus_score,
+                   compile_focus,
                    calculate_overall_scores,
                    construct_sentence)
 
-nlp = stanfordnlp.Pipeline(lang="tr")
 
+def __getattr__(name):
+    # `nlp` used to be built on import; it is now built on first access
+    if name == "nlp":
+        return get_pipeline()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-def find_type_focus_parsed(question):
+
+def find_type_focus_parsed(question, cache=None):
     """Find Question Type, Focus, and Parse Question
 
     Parameters
     ----------
     question: str
 
+    cache: QuestionParseCache
+        Optional, parsed questions are reused from it
+
     Returns
     -------
     tuple
         Type, Focus, Parsed Question
     """
     q_type = find_q_type(question)
-    parsed_q = nlp(question)
+    if cache is not None:
+        parsed_q = cache.parse(question, load_pipeline=get_pipeline)
+    else:
+        parsed_q = get_pipeline()(question)
     q_focus = find_q_focus(parsed_q)
     q_dep = parsed_q.sentences[0].dependencies
     
     return q_type, q_focus, parsed_q
 
 
+def find_compiled_question(question, cache=None):
+    """Find Question Type and Focus, Parse and Compile Question
+
+    Parameters
+    ----------
+    question: str
+
+    cache: QuestionParseCache
+        Optional, parsed questions are reused from it
+
+    Returns
+    -------
+    CompiledQuestion
+    """
+    q_type, q_focus, parsed_q = find_type_focus_parsed(question, cache)
+    return CompiledQuestion(parsed_q, q_type, q_focus)
+
+
 def entity_answer_extractor(sentence, parsed_question):
     """Extract Answer for Entity Type
 
@@ -55,7 +88,7 @@ def entity_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -67,9 +100,9 @@ def entity_answer_extractor(sentence, parsed_question):
     related_idx = find_related_words(sentence, subject_idx)
     
     if related_idx:
-        return extract_answer_with_idx(sentence, related_idx, parsed_question.text)
+        return extract_answer_with_idx(sentence, related_idx, parsed_question)
     else:
-        return extract_answer_from_whole_sent(sentence, parsed_question.text)
+        return extract_answer_from_whole_sent(sentence, parsed_question)
 
 
 def description_answer_extractor(sentence, parsed_question):
@@ -87,7 +120,7 @@ def location_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -95,7 +128,7 @@ def location_answer_extractor(sentence, parsed_question):
     str
         Answer
     """
-    question_sent = parsed_question.sentences[0]
+    question_sent = parsed_question.sentence
     sent_root_idx = find_root(sentence)
     quest_root_idx = find_root(question_sent)
     root = sentence.words[sent_root_idx - 1]
@@ -117,27 +150,28 @@ def location_answer_extractor(sentence, parsed_question):
                 idx = find_related_words(sentence, idx)
             
             if idx:
-                return extract_answer_with_idx(sentence, idx, parsed_question.text)
+                return extract_answer_with_idx(sentence, idx, parsed_question)
 
-    return extract_answer_from_whole_sent(sentence, parsed_question.text)
+    return extract_answer_from_whole_sent(sentence, parsed_question)
 
 
 def temporal_answer_extractor(sentence, parsed_question):
     # TODO: DocString
     words = sentence.words
+    features = sentence_features(sentence)
     sent = reconstruct_sentence(sentence)
-    if "yıl" in parsed_question.text.casefold() or "yıl" in sent:
-        for word in words:
-            if word.dependency_relation in ["nummod", "nmod:poss"] and word.upos == "NUM":
+    if parsed_question.mentions("yıl") or "yıl" in sent:
+        for word, number in zip(words, features.number):
+            if word.dependency_relation in ["nummod", "nmod:poss"] and number:
                 if word.dependency_relation == "nummod":
                     return word.lemma
                 else:
                     return word.text
     
     def find_temporal_phrase(temp_keyword):
-        if temp_keyword in parsed_question.text.casefold():
-            for word in words:
-                if temp_keyword in word.text.casefold():
+        if parsed_question.mentions(temp_keyword):
+            for text in features.casefolded:
+                if temp_keyword in text:
                     pattern = "(\w+\s+" + temp_keyword + ")"
                     pat = re.compile(pattern, re.IGNORECASE)
                     sent = reconstruct_sentence(sentence)
@@ -160,7 +194,7 @@ def temporal_answer_extractor(sentence, parsed_question):
         return " ".join(yuzyil)
                 
         
-    return extract_answer_from_whole_sent(sentence, parsed_question.text)
+    return extract_answer_from_whole_sent(sentence, parsed_question)
 
 
 def human_answer_extractor(sentence, parsed_question):
@@ -173,7 +207,7 @@ def human_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -183,14 +217,14 @@ def human_answer_extractor(sentence, parsed_question):
     """
     subj = find_subject(sentence)
     if subj:
-        return extract_answer_with_idx(sentence, subj, parsed_question.text)
+        return extract_answer_with_idx(sentence, subj, parsed_question)
     
     root = find_root(sentence)
     obj = find_relation(sentence, root, "obj")
     if obj:
-        return extract_answer_with_idx(sentence, subj, parsed_question.text)
+        return extract_answer_with_idx(sentence, subj, parsed_question)
 
-    return extract_answer_from_whole_sent(sentence, parsed_question.text)
+    return extract_answer_from_whole_sent(sentence, parsed_question)
 
 
 def numeric_answer_extractor(sentence, parsed_question):
@@ -203,7 +237,7 @@ def numeric_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -211,7 +245,7 @@ def numeric_answer_extractor(sentence, parsed_question):
     str
         Answer
     """
-    candidate = extract_answer_from_whole_sent(sentence, parsed_question.text)
+    candidate = extract_answer_from_whole_sent(sentence, parsed_question)
     pat = re.compile(r"(%?\d+)")
     all_ = pat.findall(candidate)
     if all_:
@@ -230,7 +264,7 @@ def yes_no_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -255,7 +289,7 @@ def other_answer_extractor(sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
     
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: CompiledQuestion
         Question
 
     Returns
@@ -263,7 +297,7 @@ def other_answer_extractor(sentence, parsed_question):
     str
         Answer
     """
-    return extract_answer_from_whole_sent(sentence, parsed_question.text)
+    return extract_answer_from_whole_sent(sentence, parsed_question)
 
 
 answer_extractors = {
@@ -288,7 +322,7 @@ def get_answer(question_type, sentence, parsed_question):
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains the answer
 
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
         Question
 
     Returns
@@ -296,6 +330,7 @@ def get_answer(question_type, sentence, parsed_question):
     str
         Answer
     """
+    parsed_question = compile_question(parsed_question, question_type)
     answer_extractor = answer_extractors[question_type]
     answer = answer_extractor(sentence, parsed_question)
 
@@ -305,7 +340,116 @@ def get_answer(question_type, sentence, parsed_question):
         return reconstruct_sentence(sentence)
 
 
-def extract_answer(passage, question_type, question_focus, parsed_question):
+pruning_stats = {"sentences": 0, "scored": 0, "pruned": 0}
+
+
+def reset_pruning_stats():
+    """Reset the counters of pruned sentences"""
+    for key in pruning_stats:
+        pruning_stats[key] = 0
+
+
+def rank_sentences(sentences, question_focus, parsed_question, prune=True, weight=1.0, offsets=None):
+    """Best sentence of `sentences` by `weight` * overall score + offset
+
+    The first sentence wins ties. In pruning mode sentences are visited in
+    descending order of an upper bound of their score, see
+    `tree_similarity_bound`, and the tree similarity of a sentence is
+    computed only if its bound can beat the best sentence so far.
+    `pruning_stats` counts scored and pruned sentences.
+
+    Parameters
+    ----------
+    sentences: list
+        list of stanfordnlp.pipeline.doc.Sentence
+
+    question_focus: str or FocusSignature
+        Words that are focused on question
+
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
+        Question
+
+    prune: bool
+        Skip sentences that cannot have the highest score
+
+    weight: float
+        Non-negative weight of the overall score
+
+    offsets: list
+        Optional, score added to every sentence
+
+    Returns
+    -------
+    tuple
+        Index of the sentence, Score
+    """
+    focus = compile_focus(question_focus, parsed_question)
+    focus_scores = [calculate_focus_score(sentence, focus) for sentence in sentences]
+    if offsets is None:
+        offsets = [0.] * len(sentences)
+
+    def fuse(scores):
+        return [weight * score + offset for score, offset in zip(scores, offsets)]
+
+    if not prune or not sentences:
+        tree_sims = [calculate_tree_similarity(sentence, parsed_question) for sentence in sentences]
+        scores = fuse(calculate_overall_scores(tree_sims, focus_scores))
+        idx = scores.index(max(scores))
+        return idx, scores[idx]
+
+    bounds = fuse(calculate_overall_scores([tree_similarity_bound(sentence, parsed_question) for sentence in sentences],
+                                           focus_scores))
+    best_score, best_idx = None, None
+    scored = 0
+    for i in sorted(range(len(sentences)), key=lambda i: (-bounds[i], i)):
+        if best_idx is not None:
+            if bounds[i] < best_score:
+                break
+            if bounds[i] == best_score and i > best_idx:
+                continue
+
+        tree_sim = calculate_tree_similarity(sentences[i], parsed_question)
+        score = weight * calculate_overall_scores([tree_sim], [focus_scores[i]])[0] + offsets[i]
+        scored += 1
+        if best_idx is None or score > best_score or (score == best_score and i < best_idx):
+            best_score, best_idx = score, i
+
+    pruning_stats["sentences"] += len(sentences)
+    pruning_stats["scored"] += scored
+    pruning_stats["pruned"] += len(sentences) - scored
+    return best_idx, best_score
+
+
+def select_sentence(passage, question_focus, parsed_question, prune=True):
+    """Select Answer Sentence
+
+    Finds the sentence with the highest overall score, the first one on
+    ties, see `rank_sentences`.
+
+    Parameters
+    ----------
+    passage: stanfordnlp.pipeline.doc.Document
+        Passage that consits of sentences
+
+    question_focus: str or FocusSignature
+        Words that are focused on question
+
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
+        Question
+
+    prune: bool
+        Skip sentences that cannot have the highest score
+
+    Returns
+    -------
+    int
+        Index of the sentence
+    """
+    idx, _ = rank_sentences(passage.sentences, question_focus, parsed_question, prune)
+    return idx
+
+
+def extract_answer(passage, question_type, question_focus, parsed_question, prune=True):
     """Extract Answer
     
     Extracts answer from passage for given `question_type`, `question_focus`, `parsed_question` 
@@ -318,34 +462,28 @@ def extract_answer(passage, question_type, question_focus, parsed_question):
     question_type: str
         Question Type
 
-    question_focus: list
-        List of words that are focused on question
+    question_focus: str or FocusSignature
+        Words that are focused on question
 
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
         Question
 
+    prune: bool
+        Skip sentences that cannot be the answer sentence, see `select_sentence`
+
     Returns
     -------
     str
         Answer
     """
-    tree_sims = []
-    for sentence in passage.sentences:
-        tree_sims.append(calculate_tree_similarity(sentence, parsed_question))
-    
-    focus_scores = []
-    for sentence in passage.sentences:
-        focus_scores.append(calculate_focus_score(sentence, question_focus))
-
-    scores = calculate_overall_scores(tree_sims, focus_scores)
-    idx = scores.index(max(scores))
-
-    answer = get_answer(question_type, passage.sentences[idx], parsed_question)
+    question = compile_question(parsed_question, question_type, question_focus)
+    idx = select_sentence(passage, question.focus, question, prune)
+    answer = get_answer(question_type or question.q_type, passage.sentences[idx], question)
     
     return answer
 
 
-def find_answer(question, passage):
+def find_answer(question, passage, cache=None):
     """Find Answer
     
     Finds answer of question in `passage`
@@ -358,12 +496,88 @@ def find_answer(question, passage):
     passage: stanfordnlp.pipeline.doc.Document
         Passage
 
+    cache: QuestionParseCache
+        Optional, parsed questions are reused from it
+
     Returns
     -------
     str
         Answer
     """
-    question_type, question_focus, parsed_question = find_type_focus_parsed(question)
-    answer = extract_answer(passage, question_type, question_focus, parsed_question)
+    compiled_question = find_compiled_question(question, cache)
+    answer = extract_answer(passage, compiled_question.q_type, compiled_question.focus, compiled_question)
     
     return answer
+
+
+def normalize_scores(scores):
+    """Min-max normalize `scores` into [0, 1], all 1 if they are equal"""
+    scores = [float(score) for score in scores]
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def find_answer_topk(question, passage_ids, retrieval_scores, passages, cache=None, retrieval_weight=0.5, prune=True):
+    """Find Answer in Top-k Passages
+
+    Finds answer of question in any of the retrieved passages. The question
+    is parsed and compiled once, and the sentences of all passages are
+    ranked together by
+
+        (1 - retrieval_weight) * overall score + retrieval_weight * normalized retrieval score
+
+    so pruning skips sentences of every passage that cannot win, see
+    `rank_sentences`. `passage_ids` and `retrieval_scores` must be of the
+    same length, ValueError is raised otherwise.
+
+    Parameters
+    ----------
+    question: str
+        Question
+
+    passage_ids: list
+        Retrieved passage IDs
+
+    retrieval_scores: list
+        Retrieval score of every passage of `passage_ids`
+
+    passages: dict
+        Passage ID and stanfordnlp.pipeline.doc.Document mapping, or an AnnotationStore
+
+    cache: QuestionParseCache
+        Optional, parsed questions are reused from it
+
+    retrieval_weight: float
+        Weight of the retrieval score, between 0 and 1
+
+    prune: bool
+        Skip sentences that cannot have the highest score
+
+    Returns
+    -------
+    tuple
+        Answer, Score; (None, 0.) if the passages have no sentences,
+        e.g. when no passage is retrieved
+    """
+    if len(passage_ids) != len(retrieval_scores):
+        raise ValueError("{} passage IDs but {} retrieval scores".format(len(passage_ids), len(retrieval_scores)))
+    if not len(passage_ids):
+        return None, 0.
+
+    sentences = []
+    offsets = []
+    for passage_id, retrieval_score in zip(passage_ids, normalize_scores(retrieval_scores)):
+        passage_sentences = passages[passage_id].sentences
+        sentences.extend(passage_sentences)
+        offsets.extend([retrieval_weight * retrieval_score] * len(passage_sentences))
+    if not sentences:
+        return None, 0.
+
+    compiled_question = find_compiled_question(question, cache)
+    idx, score = rank_sentences(sentences, compiled_question.focus, compiled_question, prune,
+                                1 - retrieval_weight, offsets)
+    answer = get_answer(compiled_question.q_type, sentences[idx], compiled_question)
+
+    return answer, score
@@ -0,0 +1,72 @@
+from .question_processing import find_q_type, find_q_focus
+from .util import bigram_tables, compile_focus
+
+
+class CompiledQuestion(object):
+    """Compiled Question
+
+    Everything answer extraction derives from a question, computed once
+    per question instead of once per sentence or word. It has the `text`
+    and `sentences` of the parsed question, so it can be used in its place.
+
+    Attributes
+    ----------
+    parsed: stanfordnlp.pipeline.doc.Document
+        Parsed question
+    text: str
+        Question
+    sentences: list
+        Sentences of the parsed question
+    sentence: stanfordnlp.pipeline.doc.Sentence
+        First sentence, the one answer extraction reads
+    casefolded: str
+        Casefolded question
+    tokens: frozenset
+        Casefolded text of the words of `sentence`
+    tables: BigramTables
+        Bigram count tables of `sentence`
+    focus: FocusSignature
+        Compiled question focus, matched by lemma
+    q_type: str
+        Question Type
+    """
+    def __init__(self, parsed_question, q_type=None, focus=None):
+        self.parsed = parsed_question
+        self.text = parsed_question.text
+        self.sentences = parsed_question.sentences
+        self.sentence = self.sentences[0]
+        self.casefolded = self.text.casefold()
+        self.tokens = frozenset(word.text.casefold() for word in self.sentence.words)
+        self.tables = bigram_tables(self.sentence)
+        self.focus = compile_focus(focus if focus is not None else find_q_focus(parsed_question), parsed_question)
+        self.q_type = q_type if q_type is not None else find_q_type(self.text)
+        self._mentions = {token: True for token in self.tokens if token in self.casefolded}
+
+    def mentions(self, text):
+        """Whether casefolded `text` is a substring of the casefolded question, memoized"""
+        found = self._mentions.get(text)
+        if found is None:
+            found = text in self.casefolded
+            self._mentions[text] = found
+        return found
+
+
+def compile_question(parsed_question, q_type=None, focus=None):
+    """`CompiledQuestion` of `parsed_question`, which may already be compiled
+
+    Parameters
+    ----------
+    parsed_question: stanfordnlp.pipeline.doc.Document
+        Question
+    q_type: str
+        Optional, Question Type; found from the text if not given
+    focus: str
+        Optional, Question Focus; found from the parse if not given
+
+    Returns
+    -------
+    CompiledQuestion
+    """
+    if isinstance(parsed_question, CompiledQuestion):
+        return parsed_question
+    return CompiledQuestion(parsed_question, q_type, focus)
@@ -0,0 +1,94 @@
+from collections import deque
+
+
+class KeywordAutomaton(object):
+    """Aho-Corasick Keyword Automaton
+
+    Finds, in one pass over a text, the smallest rank of the keywords it
+    contains as substrings. Fail links are folded into the transitions, so
+    every character of the text costs one lookup.
+
+    Attributes
+    ----------
+    transitions: list
+        Character and next state mapping of every state, characters that
+        are in no keyword go back to the start state
+    fail: list
+        Fail state of every state
+    ranks: list
+        Smallest rank of the keywords that end at every state, None if none does
+    """
+    def __init__(self, keywords):
+        """Compile the automaton
+
+        Parameters
+        ----------
+        keywords: list
+            (keyword, rank) pairs
+        """
+        self.transitions = [{}]
+        self.fail = [0]
+        self.ranks = [None]
+
+        for keyword, rank in keywords:
+            state = 0
+            for char in keyword:
+                next_state = self.transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions[state][char] = next_state
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.ranks.append(None)
+                state = next_state
+            self.ranks[state] = self._min_rank(self.ranks[state], rank)
+
+        # Breadth-first, so fail states, which are shallower, are complete
+        # when a state copies their transitions
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            fail = self.fail[state]
+            self.ranks[state] = self._min_rank(self.ranks[state], self.ranks[fail])
+            transitions = self.transitions[state]
+            for char, next_state in list(transitions.items()):
+                self.fail[next_state] = self.transitions[fail].get(char, 0)
+                queue.append(next_state)
+            for char, next_state in self.transitions[fail].items():
+                if char not in transitions:
+                    transitions[char] = next_state
+
+    @staticmethod
+    def _min_rank(rank1, rank2):
+        if rank1 is None:
+            return rank2
+        if rank2 is None:
+            return rank1
+        return min(rank1, rank2)
+
+    def min_rank(self, text, stop=None):
+        """Smallest rank of the keywords in `text`
+
+        Parameters
+        ----------
+        text: str
+        stop: int
+            Optional, scanning stops once a keyword of this rank is found
+
+        Returns
+        -------
+        int
+            None if `text` contains no keyword
+        """
+        transitions = self.transitions
+        ranks = self.ranks
+        best = None
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            rank = ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == stop:
+                    break
+        return best
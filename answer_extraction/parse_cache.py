@@ -0,0 +1,121 @@
+from collections import OrderedDict
+
+from preprocessing.annotation_cache import AnnotationCache
+from preprocessing.reader import iter_question_groups
+
+from .pipeline import get_pipeline, pipeline_config
+
+
+def normalize_question(question):
+    """Normalize whitespace of `question`, the text that is parsed and cached"""
+    return " ".join(question.split())
+
+
+class QuestionParseCache(object):
+    """Question Parse Cache
+
+    Parsed questions keyed by normalized question text and pipeline
+    config, with an in-memory LRU tier in front of an optional on-disk
+    tier, so repeated questions skip the pipeline.
+
+    Attributes
+    ----------
+    config: str
+        Pipeline config that parses depend on
+    maxsize: int
+        Number of parsed questions kept in memory
+    disk: AnnotationCache
+        Optional, on-disk tier
+    hits: int
+        Number of questions found in either tier
+    misses: int
+        Number of questions parsed
+    """
+    def __init__(self, path=None, config=pipeline_config(), maxsize=4096):
+        self.config = config
+        self.maxsize = maxsize
+        self.disk = AnnotationCache(path, config) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+
+    def _remember(self, text, parsed):
+        self._memory[text] = parsed
+        self._memory.move_to_end(text)
+        if len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def parse(self, question, nlp=None, load_pipeline=get_pipeline):
+        """Parsed `question`, running `nlp` only if it is not cached
+
+        Parameters
+        ----------
+        question: str
+            Question
+        nlp: stanfordnlp.pipeline.core.Pipeline
+            Optional, pipeline matching `config`
+        load_pipeline: callable
+            Returns the pipeline when `nlp` is not given; called on a miss
+            only, so cached questions never load stanfordnlp
+
+        Returns
+        -------
+        stanfordnlp.pipeline.doc.Document
+        """
+        text = normalize_question(question)
+        parsed = self._memory.get(text)
+        if parsed is None and self.disk is not None:
+            parsed = self.disk.get(text)
+        if parsed is None:
+            self.misses += 1
+            if nlp is None:
+                nlp = load_pipeline()
+            parsed = nlp(text)
+            if self.disk is not None:
+                self.disk.put(text, parsed)
+        else:
+            self.hits += 1
+        self._remember(text, parsed)
+        return parsed
+
+    def prewarm(self, questions, nlp):
+        """Parse and cache every question of `questions` that is not cached yet
+
+        Parameters
+        ----------
+        questions: iterable
+            Questions
+        nlp: stanfordnlp.pipeline.core.Pipeline
+            Pipeline matching `config`
+
+        Returns
+        -------
+        int
+            Number of questions parsed
+        """
+        misses = self.misses
+        for question in questions:
+            self.parse(question, nlp)
+        return self.misses - misses
+
+    def prewarm_question_groups(self, question_answer_path, nlp, encoding="utf-16"):
+        """Prewarm with every question of soru_gruplari.txt
+
+        Parameters
+        ----------
+        question_answer_path: str
+            Path to question groups
+        nlp: stanfordnlp.pipeline.core.Pipeline
+            Pipeline matching `config`
+        encoding: str
+            Encoding type
+
+        Returns
+        -------
+        int
+            Number of questions parsed
+        """
+        questions = (question.text
+                     for qg in iter_question_groups(question_answer_path, encoding)
+                     for question in qg.questions)
+        return self.prewarm(questions, nlp)
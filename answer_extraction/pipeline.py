@@ -0,0 +1,75 @@
+import subprocess
+import sys
+import threading
+import time
+
+QUESTION_PROCESSORS = "tokenize,mwt,pos,lemma,depparse"
+
+_pipelines = {}
+_lock = threading.Lock()
+
+
+def pipeline_config(lang="tr", processors=QUESTION_PROCESSORS):
+    """Config string of a pipeline, e.g. to key cached parses"""
+    if processors is None:
+        return "lang={}".format(lang)
+    return "lang={};processors={}".format(lang, processors)
+
+
+def get_pipeline(lang="tr", processors=QUESTION_PROCESSORS):
+    """Process-wide stanfordnlp pipeline
+
+    stanfordnlp and its models are loaded on the first call for a given
+    config, not on import, so tools that never parse do not pay for them.
+
+    Parameters
+    ----------
+    lang: str
+        Language
+    processors: str
+        Comma separated processors, None for the stanfordnlp default
+
+    Returns
+    -------
+    stanfordnlp.pipeline.core.Pipeline
+    """
+    config = pipeline_config(lang, processors)
+    nlp = _pipelines.get(config)
+    if nlp is not None:
+        return nlp
+
+    with _lock:
+        if config not in _pipelines:
+            import stanfordnlp
+
+            kwargs = {"lang": lang}
+            if processors is not None:
+                kwargs["processors"] = processors
+            try:
+                _pipelines[config] = stanfordnlp.Pipeline(**kwargs)
+            except:
+                stanfordnlp.download(lang)
+                _pipelines[config] = stanfordnlp.Pipeline(**kwargs)
+        return _pipelines[config]
+
+
+def benchmark_startup(module="answer_extraction.answer_extraction"):
+    """Time importing `module` in a fresh interpreter and building the pipeline
+
+    Returns
+    -------
+    dict
+        Seconds to import `module` and to build the question pipeline
+    """
+    code = "import time; start = time.time(); import {}; print(time.time() - start)".format(module)
+    import_time = float(subprocess.check_output([sys.executable, "-c", code]).decode().split()[-1])
+
+    start = time.time()
+    get_pipeline()
+    pipeline_time = time.time() - start
+
+    return {"import": import_time, "pipeline": pipeline_time}
+
+
+if __name__ == "__main__":
+    print(benchmark_startup())
@@ -1,5 +1,7 @@
 import copy
+import time
 
+from .keyword_automaton import KeywordAutomaton
 from .util import (find_relation,
                    find_root,
                    find_related_words,
@@ -7,50 +9,6 @@ from .util import (find_relation,
                    construct_answer_from_idx,
                    find_subject)
 
-Entity = [
-    "hangisidir",
-    "nedir",
-    "ne denir",
-    "ne ad verilir",
-    "nedir",
-    "denir",
-]
-
-Location = [
-    "hangi bölge",
-    "hangi il",
-    "hangi şehir",
-    "hangi ülke",
-    "nere",
-]
-
-Human = [
-    "kim",
-]
-
-Numeric = [
-    "ne kadar",
-    "kaç",
-    "hangi tarih",
-    "hangi yıl",
-    "hangi dönem",
-    "hangi çağ",
-]
-
-Reason = [
-    "nasıl",
-]
-
-
-proper_classes = {
-    "Entity": Entity,
-    "Location" : Location,
-    "Human": Human,
-    "Numeric": Numeric,
-    "Reason": Reason,
-}
-
-
 Location = [
     "hangi bölge",
     "hangi il",
@@ -172,6 +130,23 @@ proper_classes = {
     "Entity": Entity,
 }
 
+fallback_classes = [
+    ("Entity", ["hangi"]),
+    ("Description", ["ne"]),
+    ("YesNo", YesNo),
+]
+
+q_types = list(proper_classes) + [class_name for class_name, _ in fallback_classes]
+
+# Rank of a keyword is the priority of its class, the first class with a
+# keyword in the question wins
+q_type_automaton = KeywordAutomaton([
+    (key_word, rank)
+    for rank, (_, _class) in enumerate(list(proper_classes.items()) + fallback_classes)
+    for key_word in _class
+])
+
+
 def find_q_type(question):
     """Find Question Type
 
@@ -185,13 +160,36 @@ def find_q_type(question):
     str
         Class Type
     """
+    rank = q_type_automaton.min_rank(question.casefold(), stop=0)
+    return q_types[rank] if rank is not None else "Other"
+
+
+def find_q_types(questions):
+    """Find Question Types
+
+    Parameters
+    ----------
+    questions: iterable
+        Questions
+
+    Returns
+    -------
+    list
+        Class Type of every question
+    """
+    min_rank = q_type_automaton.min_rank
+    ranks = (min_rank(question.casefold(), stop=0) for question in questions)
+    return [q_types[rank] if rank is not None else "Other" for rank in ranks]
+
+
+def _find_q_type_scan(question):
+    # Keyword by keyword scan that `q_type_automaton` replaces, kept for `benchmark_find_q_type`
     q = question.casefold()
     for class_name, _class in proper_classes.items():
         for key_word in _class:
             if key_word in q:
                 return class_name
-    
-    
+
     if "hangi" in q:
         return "Entity"
     elif "ne" in q:
@@ -202,6 +200,38 @@ def find_q_type(question):
     return "Other"
 
 
+def benchmark_find_q_type(questions, repeat=10):
+    """Compare `find_q_types` with scanning keyword by keyword
+
+    Parameters
+    ----------
+    questions: list
+        Questions
+    repeat: int
+        Number of times questions are classified
+
+    Returns
+    -------
+    dict
+        Seconds of both and the speedup of the automaton
+    """
+    start = time.time()
+    for _ in range(repeat):
+        scanned = [_find_q_type_scan(question) for question in questions]
+    scan = time.time() - start
+
+    start = time.time()
+    for _ in range(repeat):
+        found = find_q_types(questions)
+    automaton = time.time() - start
+
+    assert scanned == found
+    speedup = scan / automaton if automaton else float("inf")
+    print("Classified {} questions {} times in {:.3f}s by scanning, {:.3f}s with the automaton ({:.2f}x)".format(
+        len(questions), repeat, scan, automaton, speedup))
+    return {"scan": scan, "automaton": automaton, "speedup": speedup}
+
+
 def find_q_focus(question):
     """Find Question Focus
 
@@ -1,4 +1,7 @@
-import copy
+from collections import Counter
+
+from preprocessing.dependency_tree import dependency_tree
+from preprocessing.sentence_features import lemma_signature, sentence_features
 
 
 def find_root(sentence):
@@ -14,10 +17,7 @@ def find_root(sentence):
         Greater than 0 if sentence has root
         0 otherwise
     """
-    for word in sentence.words:
-        if word.governor == 0:
-            return int(word.index)
-    return 0
+    return dependency_tree(sentence).root
 
 
 def find_relation(sentence, idx, relation):
@@ -41,12 +41,7 @@ def find_relation(sentence, idx, relation):
     list
         list of related words    
     """
-    related_idx = []
-    for word in sentence.words:
-        if word.governor == idx and word.dependency_relation == relation:
-            related_idx.append(int(word.index))
-            
-    return related_idx
+    return dependency_tree(sentence).dependents(idx, relation)
 
 
 def find_related_words(sentence, idx):
@@ -66,14 +61,7 @@ def find_related_words(sentence, idx):
     list
         List of enhanced indices
     """
-    idx_ = []
-
-    while idx_ != idx:
-        idx_ = copy.deepcopy(idx)
-        for word in sentence.words:
-            if word.governor in idx and int(word.index) not in idx:
-                idx.append(int(word.index))
-                
+    idx.extend(dependency_tree(sentence).descendants(idx))
     return idx
 
 
@@ -114,11 +102,7 @@ def find_left_child(sentence, idx):
     int
         Index of left child
     """
-    for word in sentence.words:
-        if word.governor == idx and word.dependency_relation == "obl":
-            return int(word.index)
-        
-    return -1
+    return dependency_tree(sentence).first_dependent(idx, "obl")
 
 
 def construct_answer_from_idx(sentence, idx):
@@ -141,11 +125,7 @@ def construct_answer_from_idx(sentence, idx):
 
 def find_child(sentence, idx, relation):
     # TODO: Doc-String
-    for word in sentence.words:
-        if word.governor == idx and word.dependency_relation == relation:
-            return int(word.index)
-    
-    return -1
+    return dependency_tree(sentence).first_dependent(idx, relation)
 
 
 def find_subject(sentence):
@@ -160,14 +140,7 @@ def find_subject(sentence):
     list
         Indices 
     """
-    root_idx = find_root(sentence)
-    subjects = []
-    if root_idx > 0:
-        for word in sentence.words:
-            if word.governor == root_idx and word.dependency_relation == "nsubj":
-                subjects.append(int(word.index))
-                
-    return subjects
+    return list(sentence_features(sentence).subjects)
 
 
 def construct_bigrams(words):
@@ -260,6 +233,23 @@ def sim(bigram1, bigram2):
     return (s(dep_1, dep_2) + s(head_1, head_2)) * q(type_1, type_2)
 
 
+def question_mentions(question):
+    """Test of whether a casefolded text is a substring of the casefolded `question`
+
+    Parameters
+    ----------
+    question: str or CompiledQuestion
+        Question
+
+    Returns
+    -------
+    function
+    """
+    if isinstance(question, str):
+        return question.casefold().__contains__
+    return question.mentions
+
+
 def check_word_in_question(word, question):
     """Check Word
     
@@ -270,7 +260,7 @@ def check_word_in_question(word, question):
     word: stanfordnlp.pipeline.doc.Word
         Word to check
 
-    question: str
+    question: str or CompiledQuestion
         Question
 
     Returns
@@ -278,17 +268,22 @@ def check_word_in_question(word, question):
     True if word is included
     False otw.
     """
-    return word.text.casefold() in question.casefold() 
+    return question_mentions(question)(word.text.casefold())
 
 
 def extract_answer_from_whole_sent(sentence, question):
     # TODO: Doc-String
-    return " ".join([word.text.casefold() for word in sentence.words if word.text.casefold() not in question.casefold() and word.upos != "PUNCT"])
+    features = sentence_features(sentence)
+    mentions = question_mentions(question)
+    return " ".join([text for text, punct in zip(features.casefolded, features.punct) if not punct and not mentions(text)])
 
 
 def extract_answer_with_idx(sentence, idx, question):
     # TODO: Doc-String
-    return " ".join([word.text.casefold() for word in sentence.words if (word.text.casefold() not in question.casefold() or word.dependency_relation == "nsubj") and int(word.index) in idx and word.upos != "PUNCT"])
+    features = sentence_features(sentence)
+    mentions = question_mentions(question)
+    return " ".join([text for word, text, punct in zip(sentence.words, features.casefolded, features.punct)
+                     if not punct and int(word.index) in idx and (word.dependency_relation == "nsubj" or not mentions(text))])
 
 
 def reconstruct_sentence(sentence):
@@ -296,17 +291,74 @@ def reconstruct_sentence(sentence):
     return " ".join([word.text for word in sentence.words])
 
 
+class BigramTables(object):
+    """Bigram Count Tables
+
+    Counts of the dependents, heads, and both paired with the relation, of
+    the bigrams of a sentence. `sim` summed over all bigram pairs is
+
+        dependent matches + head matches
+        + (theta - 1) * (dependent & relation matches + head & relation matches)
+
+    so a sentence is scored against these tables in one pass over its bigrams.
+
+    Attributes
+    ----------
+    size: int
+        Number of bigrams
+    dependents: collections.Counter
+    heads: collections.Counter
+    typed_dependents: collections.Counter
+        (dependent, relation) counts
+    typed_heads: collections.Counter
+        (head, relation) counts
+    """
+    def __init__(self, bigrams):
+        self.size = len(bigrams)
+        self.dependents = Counter(dep for dep, _, _ in bigrams)
+        self.heads = Counter(head for _, _, head in bigrams)
+        self.typed_dependents = Counter((dep, type_) for dep, type_, _ in bigrams)
+        self.typed_heads = Counter((head, type_) for _, type_, head in bigrams)
+
+    def score(self, bigrams, theta=2):
+        """Sum of `sim` of every bigram of `bigrams` with every counted bigram"""
+        matches = 0
+        typed_matches = 0
+        for dep, type_, head in bigrams:
+            matches += self.dependents[dep] + self.heads[head]
+            typed_matches += self.typed_dependents[(dep, type_)] + self.typed_heads[(head, type_)]
+        return matches + (theta - 1) * typed_matches
+
+
+def bigram_tables(sentence):
+    """`BigramTables` of `sentence`, built on first use and kept on it"""
+    tables = getattr(sentence, "_bigram_tables", None)
+    if tables is None:
+        tables = BigramTables(construct_bigrams(sentence.words))
+        sentence._bigram_tables = tables
+    return tables
+
+
+def question_tables(parsed_question):
+    """`BigramTables` of a parsed or compiled question"""
+    tables = getattr(parsed_question, "tables", None)
+    return tables if tables is not None else bigram_tables(parsed_question.sentences[0])
+
+
 def calculate_tree_similarity(sentence, parsed_question):
     """Calculate Dependency Tree Similarity
 
     Formulation has been taken from [https://www.cmpe.boun.edu.tr/~ozgur/papers/617_Paper.pdf]
 
+    Computed in O(|S| + |Q|) from the `BigramTables` of the question, which
+    are built once per question.
+
     Parameters
     ----------
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains answer
 
-    parsed_question: stanfordnlp.pipeline.doc.Document
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
         Question
 
     Returns
@@ -314,41 +366,122 @@ def calculate_tree_similarity(sentence, parsed_question):
     float
         Similarity between dependency trees of sentence and question
     """
-    sent_bigrams = construct_bigrams(sentence.words)
-    quest_bigrams = construct_bigrams(parsed_question.sentences[0].words)
+    sent_bigrams = sentence_features(sentence).bigrams
+    quest_tables = question_tables(parsed_question)
+
+    return quest_tables.score(sent_bigrams) / (len(sent_bigrams) + quest_tables.size)
+
+
+def tree_similarity_bound(sentence, parsed_question, theta=2):
+    """Upper bound of `calculate_tree_similarity`
+
+    Relation matches are a subset of the dependent and head matches, so
+    the score is at most `theta` times the untyped matches, which are
+    counted over the distinct words of the question only.
+
+    Parameters
+    ----------
+    sentence: stanfordnlp.pipeline.doc.Sentence
+        Sentence that contains answer
+
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
+        Question
+
+    Returns
+    -------
+    float
+        Upper bound of the similarity between dependency trees of sentence and question
+    """
+    features = sentence_features(sentence)
+    quest_tables = question_tables(parsed_question)
+    matches = sum(count * features.dependents[dep] for dep, count in quest_tables.dependents.items()) \
+        + sum(count * features.heads[head] for head, count in quest_tables.heads.items())
+
+    return theta * matches / (len(features.bigrams) + quest_tables.size)
 
-    score = 0
-    for sent_bigram in sent_bigrams:
-        for quest_bigram in quest_bigrams:
-            score += sim(sent_bigram, quest_bigram)
 
-    return score / (len(sent_bigrams) + len(quest_bigrams))
+class FocusSignature(object):
+    """Compiled Question Focus
+
+    Lemmas of the focus words with their counts and their lemma signature,
+    so a sentence without any focus lemma is ruled out with a single AND.
+    Focus words are surface texts of question words, e.g. "şehri"; with the
+    parsed question they are replaced by their lemmas, e.g. "şehir", the
+    representation sentences are matched in.
+
+    Attributes
+    ----------
+    weights: dict
+        Focus lemma and number of times it occurs mapping
+    size: int
+        Number of focus words
+    signature: int
+        Lemma signature of the focus lemmas, see `preprocessing.sentence_features.lemma_signature`
+    """
+    def __init__(self, question_focus, parsed_question=None):
+        words = question_focus.split() if isinstance(question_focus, str) else list(question_focus)
+        if parsed_question is not None:
+            lemmas = {}
+            for word in parsed_question.sentences[0].words:
+                if isinstance(word.lemma, str):
+                    lemmas.setdefault(word.text, word.lemma)
+            words = [lemmas.get(word, word) for word in words]
+        self.weights = {}
+        for word in words:
+            self.weights[word] = self.weights.get(word, 0) + 1
+        self.size = len(words)
+        self.signature = lemma_signature(self.weights)
+
+    def hits(self, sentence):
+        """Number of focus words, with repeats, that are lemmas of `sentence`"""
+        features = sentence_features(sentence)
+        if not self.signature & features.lemma_signature:
+            return 0
+        lemmas = features.lemmas
+        return sum(weight for word, weight in self.weights.items() if word in lemmas)
+
+
+def compile_focus(question_focus, parsed_question=None):
+    """`FocusSignature` of `question_focus`, which may already be compiled
+
+    Parameters
+    ----------
+    question_focus: str, list or FocusSignature
+        Focused words
+    parsed_question: stanfordnlp.pipeline.doc.Document or CompiledQuestion
+        Optional, question the focus words come from, to match them by lemma
+
+    Returns
+    -------
+    FocusSignature
+    """
+    if isinstance(question_focus, FocusSignature):
+        return question_focus
+    return FocusSignature(question_focus or [], parsed_question)
 
 
 def calculate_focus_score(sentence, question_focus):
     """Calculate Focus Words Score
 
+    Share of the focus words that are lemmas of `sentence`. A focus string
+    is split into words, which are compared as they are; compile them with
+    `compile_focus` and the parsed question to compare their lemmas.
 
     Parameters
     ----------
     sentence: stanfordnlp.pipeline.doc.Sentence
         Sentence that contains answer
     
-    question_focus: list
-        List of focused words
+    question_focus: str, list or FocusSignature
+        Focused words; compile them with `compile_focus` to score many sentences
 
     Returns 
     -------
     float
         Similarity score based on focused words of questionf
     """
-    score = 0
-    sentence_lemmas = [word.lemma for word in sentence.words]
-    for lemma in question_focus:
-        if lemma in sentence_lemmas:
-            score += 1
-
-    return score / len(question_focus) if question_focus else 0
+    focus = compile_focus(question_focus)
+    return focus.hits(sentence) / focus.size if focus.size else 0
 
 
 def calculate_overall_scores(tree_similarities, focus_scores):
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BM25 inverted index with MaxScore dynamic pruning
+"""
+import heapq
+import pickle
+from itertools import islice
+
+import numpy as np
+
+from sklearn.feature_extraction.text import CountVectorizer
+
+#%%
+class BM25Index(object):
+    """BM25 Inverted Index
+
+    Postings are stored column-wise (one posting list per term) with the
+    BM25 impact of every posting precomputed, so a query only touches the
+    posting lists of its own terms. Top-k is found with MaxScore: terms whose
+    summed upper bounds cannot beat the current k-th score are only probed
+    for documents found through the other terms.
+
+    Attributes
+    ----------
+    vector: CountVectorizer
+        Fitted vectorizer, used for tokenization and term IDs
+    indptr: numpy.ndarray
+        Start of the posting list of every term
+    indices: numpy.ndarray
+        Passage rows of postings, sorted within every posting list
+    impacts: numpy.ndarray
+        BM25 score contribution of every posting
+    upper_bounds: numpy.ndarray
+        Maximum impact of every term
+    passage_ids: numpy.ndarray
+        Passage ID of every row
+    """
+    def __init__(self, vector, indptr, indices, impacts, upper_bounds, passage_ids, k1=1.2, b=0.75):
+        self.vector = vector
+        self.indptr = indptr
+        self.indices = indices
+        self.impacts = impacts
+        self.upper_bounds = upper_bounds
+        self.passage_ids = np.asarray(passage_ids)
+        self.rows = {passage_id: row for row, passage_id in enumerate(self.passage_ids.tolist())}
+        self.k1 = k1
+        self.b = b
+        self._analyzer = None
+
+    @classmethod
+    def build(cls, train_data, passage_ids, k1=1.2, b=0.75):
+        """Build the index
+
+        Parameters
+        ----------
+        train_data: list
+            passage texts
+        passage_ids: list
+            Passage ID of each text of `train_data`
+        k1: float
+            term frequency saturation
+        b: float
+            length normalization
+
+        Returns
+        -------
+        BM25Index
+        """
+        vector = CountVectorizer()
+        counts = vector.fit_transform(train_data).tocsc()
+        counts.sort_indices()
+
+        n_docs = counts.shape[0]
+        doc_lengths = np.asarray(counts.sum(axis=1), dtype=np.float64).ravel()
+        avg_length = doc_lengths.mean() if n_docs else 0.
+        doc_freqs = np.diff(counts.indptr)
+        idf = np.log(1. + (n_docs - doc_freqs + .5) / (doc_freqs + .5))
+
+        tf = counts.data.astype(np.float64)
+        terms = np.repeat(np.arange(counts.shape[1]), doc_freqs)
+        norms = k1 * (1. - b + b * doc_lengths[counts.indices] / avg_length)
+        impacts = idf[terms] * tf * (k1 + 1.) / (tf + norms)
+
+        upper_bounds = np.zeros(counts.shape[1])
+        np.maximum.at(upper_bounds, terms, impacts)
+
+        return cls(vector, counts.indptr, counts.indices, impacts, upper_bounds, passage_ids, k1, b)
+
+    def query_terms(self, text):
+        """Term IDs and counts of the known words of `text`
+
+        Parameters
+        ----------
+        text: str
+
+        Returns
+        -------
+        dict
+            Term ID and query term frequency mapping
+        """
+        if self._analyzer is None:
+            self._analyzer = self.vector.build_analyzer()
+        vocabulary = self.vector.vocabulary_
+        terms = {}
+        for token in self._analyzer(text):
+            term = vocabulary.get(token)
+            if term is not None:
+                terms[term] = terms.get(term, 0) + 1
+        return terms
+
+    def top_k(self, text, n):
+        """Find the n best scoring rows for `text` with MaxScore
+
+        Parameters
+        ----------
+        text: str
+        n: int
+            number of passages
+
+        Returns
+        -------
+        list
+            (score, row) pairs, best first; only rows that share a term with `text`
+        """
+        terms = self.query_terms(text)
+        if n <= 0 or not terms:
+            return []
+
+        postings = []
+        for term, count in terms.items():
+            start, end = self.indptr[term], self.indptr[term + 1]
+            postings.append((self.upper_bounds[term] * count,
+                             self.indices[start:end],
+                             self.impacts[start:end] * count))
+        postings.sort(key=lambda posting: posting[0])
+
+        bounds = [posting[0] for posting in postings]
+        docs = [posting[1] for posting in postings]
+        impacts = [posting[2] for posting in postings]
+        lengths = [len(doc) for doc in docs]
+        cumulative = np.cumsum(bounds).tolist()
+        positions = [0] * len(postings)
+
+        heap = []
+        threshold = 0.
+        first_essential = 0
+        while True:
+            doc = None
+            for i in range(first_essential, len(postings)):
+                if positions[i] < lengths[i]:
+                    candidate = docs[i][positions[i]]
+                    if doc is None or candidate < doc:
+                        doc = candidate
+            if doc is None:
+                break
+
+            score = 0.
+            for i in range(first_essential, len(postings)):
+                if positions[i] < lengths[i] and docs[i][positions[i]] == doc:
+                    score += impacts[i][positions[i]]
+                    positions[i] += 1
+
+            for i in range(first_essential - 1, -1, -1):
+                if score + cumulative[i] <= threshold:
+                    break
+                position = positions[i] + int(np.searchsorted(docs[i][positions[i]:], doc))
+                positions[i] = position
+                if position < lengths[i] and docs[i][position] == doc:
+                    score += impacts[i][position]
+
+            entry = (score, -int(doc))
+            if len(heap) < n:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+            else:
+                continue
+
+            if len(heap) == n:
+                threshold = heap[0][0]
+                while first_essential < len(postings) and cumulative[first_essential] <= threshold:
+                    first_essential += 1
+
+        return [(score, -row) for score, row in sorted(heap, reverse=True)]
+
+    def score(self, text, passage_ids):
+        """BM25 scores of given passages for `text`
+
+        Parameters
+        ----------
+        text: str
+        passage_ids: list
+
+        Returns
+        -------
+        numpy.ndarray
+            scores
+        """
+        rows = np.array([self.rows[passage_id] for passage_id in passage_ids], dtype=self.indices.dtype)
+        scores = np.zeros(len(rows))
+        if not len(rows):
+            return scores
+        for term, count in self.query_terms(text).items():
+            start, end = self.indptr[term], self.indptr[term + 1]
+            docs = self.indices[start:end]
+            positions = np.minimum(np.searchsorted(docs, rows), len(docs) - 1)
+            hits = docs[positions] == rows
+            scores[hits] += self.impacts[start:end][positions[hits]] * count
+        return scores
+
+    def search(self, texts, n):
+        """Find the n best scoring passages of every text
+
+        Passages that share no term with a text are appended in row order with
+        a score of 0 when fewer than n passages match it.
+
+        Parameters
+        ----------
+        texts: list
+            list of str
+        n: int
+            number of passages
+
+        Returns
+        -------
+        numpy.ndarray
+            ids : (len(texts), n) passage IDs, best first
+        numpy.ndarray
+            scores : (len(texts), n) BM25 scores
+        """
+        n = min(n, len(self.passage_ids))
+        ids = np.empty((len(texts), n), dtype=self.passage_ids.dtype)
+        scores = np.zeros((len(texts), n))
+        for i, text in enumerate(texts):
+            hits = self.top_k(text, n)
+            rows = [row for _, row in hits]
+            if len(rows) < n:
+                matched = set(rows)
+                unmatched = (row for row in range(len(self.passage_ids)) if row not in matched)
+                rows += list(islice(unmatched, n - len(rows)))
+            ids[i] = self.passage_ids[rows]
+            scores[i, :len(hits)] = [score for score, _ in hits]
+        return ids, scores
+
+    def save(self, file_path):
+        analyzer, self._analyzer = self._analyzer, None
+        with open(file_path, "wb") as f:
+            pickle.dump(self, f)
+        self._analyzer = analyzer
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, "rb") as f:
+            return pickle.load(f)
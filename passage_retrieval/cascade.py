@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Adaptive candidate depth for the reranking cascade
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+#%%
+class AdaptiveDepth(object):
+    """Adaptive Depth
+
+    Chooses how many first-stage candidates to rerank per query. Candidates
+    whose score is within `margin` (relative to the rank 1 score) of the top
+    candidate are kept, so a query with a clear winner is reranked shallowly
+    and a query with a flat score distribution gets a deeper pool.
+
+    Attributes
+    ----------
+    k_min: int
+        smallest depth
+    k_max: int
+        largest depth, also the first-stage depth to retrieve
+    margin: float
+        relative score margin to the rank 1 candidate
+    """
+    def __init__(self, k_min=1, k_max=15, margin=0.2):
+        self.k_min = k_min
+        self.k_max = k_max
+        self.margin = margin
+
+    def choose_depths(self, scores):
+        """Depth of every query
+
+        Parameters
+        ----------
+        scores: numpy.ndarray
+            (n_queries, k) first-stage scores, best first
+
+        Returns
+        -------
+        numpy.ndarray
+            Depths between k_min and min(k_max, k)
+        """
+        scores = np.asarray(scores, dtype=np.float64)
+        if scores.ndim == 1:
+            scores = scores[None, :]
+        k_max = min(self.k_max, scores.shape[1])
+        if not k_max:
+            return np.zeros(len(scores), dtype=np.int64)
+
+        scores = scores[:, :k_max]
+        cutoff = scores[:, :1] * (1. - self.margin)
+        depths = (scores >= cutoff).sum(axis=1)
+        depths[scores[:, 0] <= 0] = k_max
+        return np.clip(depths, min(self.k_min, k_max), k_max)
+#%%
+def recall_latency_report(ids, scores, relevant_ids, cascade, rerank=None):
+    """Compare fixed depths with `cascade` on recall and reranking cost
+
+    Parameters
+    ----------
+    ids: numpy.ndarray
+        (n_queries, k) first-stage passage IDs, best first
+    scores: numpy.ndarray
+        (n_queries, k) first-stage scores
+    relevant_ids: list
+        Related passage ID of every query
+    cascade: AdaptiveDepth
+    rerank: callable
+        Optional, rerank(query_index, candidate_ids); timed when given
+
+    Returns
+    -------
+    DataFrame
+        Depth, recall, mean candidates per query and, when `rerank` is given,
+        mean reranking seconds per query
+    """
+    ids = np.asarray(ids)
+    relevant = np.asarray(relevant_ids)[:, None]
+    ranks = np.where((ids == relevant).any(axis=1), (ids == relevant).argmax(axis=1), ids.shape[1])
+
+    def measure(depths):
+        row = {'Recall': float(np.mean(ranks < depths)), 'Candidates': float(np.mean(depths))}
+        if rerank is not None:
+            start = time.time()
+            for i, depth in enumerate(depths):
+                rerank(i, ids[i, :depth].tolist())
+            row['Seconds'] = (time.time() - start) / max(len(depths), 1)
+        return row
+
+    report = []
+    for k in range(1, min(cascade.k_max, ids.shape[1]) + 1):
+        report.append(dict(Depth=str(k), **measure(np.full(len(ids), k))))
+    report.append(dict(Depth='adaptive', **measure(cascade.choose_depths(scores))))
+    return pd.DataFrame(report)
@@ -16,6 +16,8 @@ import pickle
 
 import preprocessing
 from passage_retrieval.paragraph_prediction import analysis
+from passage_retrieval.cascade import AdaptiveDepth, recall_latency_report
+from passage_retrieval.retrieval_index import RetrievalIndex
 from answer_extraction.util import calculate_tree_similarity
 
 #%%
@@ -50,16 +52,15 @@ sample = q_idx[:]
 questions = [q_dict[id_][0].text for id_ in sample]
 
 #%%
-similar_pars, similar_pars_idx = analysis("tf_idf", list(passages.values()), questions, passages, 5, "word")
+index = RetrievalIndex.build(passages, mode="tf_idf", analyzer="word")
+cascade = AdaptiveDepth(k_min=1, k_max=5)
+similar_pars_idx, similar_pars_scores = index.search(questions, cascade.k_max)
+depths = cascade.choose_depths(similar_pars_scores)
 
-pred_pars = []
-true_pars = []
-for i, q_id in enumerate(sample):
-    q_, a, rp_id = q_dict[q_id]
-    
-    similar_pars_idx_ = similar_pars_idx[i*5: (i+1)*5]
+def rerank_by_tree_similarity(i, candidate_ids):
+    q_ = q_dict[sample[i]][0]
     par_scores = []
-    for p_id in similar_pars_idx_:
+    for p_id in candidate_ids:
         scores = []
         for sent in passages_stan[p_id].sentences:
             scores.append(calculate_tree_similarity(sent, q_))
@@ -67,9 +68,17 @@ for i, q_id in enumerate(sample):
         par_scores.append(max(scores))
 
     argmax = par_scores.index(max(par_scores))
-    pred_pars.append(similar_pars_idx_[argmax])
+    return candidate_ids[argmax]
+
+pred_pars = []
+true_pars = []
+for i, q_id in enumerate(sample):
+    q_, a, rp_id = q_dict[q_id]
+    pred_pars.append(rerank_by_tree_similarity(i, similar_pars_idx[i, :depths[i]].tolist()))
     true_pars.append(rp_id)
 #%%
+recall_latency_report(similar_pars_idx, similar_pars_scores, true_pars, cascade, rerank_by_tree_similarity)
+#%%
 similar_pars, similar_pars_idx = analysis("tf_idf", list(passages.values()), questions, passages, 1, "word")
 
 #%%
@@ -9,10 +9,13 @@ import pickle
 import sys
 sys.path.append("..")
 
+import numpy as np
 import pandas as pd
 
 from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from passage_retrieval.bm25 import BM25Index
+from passage_retrieval.top_k import find_top_k
 #%%
 def load_passages(file_path):
     """Load passage pickle
@@ -93,15 +96,10 @@ def fit_count_occurence_matrix(train_data):
         count_vec : count vector
     csr_matrix
         count_occurs : count matrix
-    DataFrame
-        count_occur_df : dataframe that holds the words and counts
     """
     count_vec = CountVectorizer()
     count_occurs = count_vec.fit_transform(train_data)
-    count_occur_df = pd.DataFrame((count, word) for word, count in zip(count_occurs.toarray().tolist()[0], count_vec.get_feature_names()))
-    count_occur_df.columns = ['Word', 'Count']
-    count_occur_df.sort_values('Count', ascending=False, inplace=True)
-    return count_vec, count_occurs, count_occur_df
+    return count_vec, count_occurs
 #%%
 def fit_normalized_count_occurrence_matrix(train_data):
     """Fit and transform the Vectorizer as normalized count vectors
@@ -116,15 +114,10 @@ def fit_normalized_count_occurrence_matrix(train_data):
         norm_count_vec : normalized count vector
     csr_matrix
         count_occurs : normalized count matrix
-    DataFrame
-        count_occur_df : dataframe that holds the words and normalized counts
     """
     norm_count_vec = TfidfVectorizer(use_idf=False, norm='l2')
     norm_count_occurs = norm_count_vec.fit_transform(train_data)
-    norm_count_occur_df = pd.DataFrame((count, word) for word, count in zip(norm_count_occurs.toarray().tolist()[0], norm_count_vec.get_feature_names()))
-    norm_count_occur_df.columns = ['Word', 'Count']
-    norm_count_occur_df.sort_values('Count', ascending=False, inplace=True)
-    return norm_count_vec, norm_count_occurs, norm_count_occur_df
+    return norm_count_vec, norm_count_occurs
 #%%
 def fit_tf_idf_matrix(train_data, analyzer='word'):
     """Fit and transform the Vectorizer as tf-idf count vectors
@@ -140,15 +133,45 @@ def fit_tf_idf_matrix(train_data, analyzer='word'):
         norm_count_vec : tf-idf count vector
     csr_matrix
         count_occurs : tf-idf count matrix
-    DataFrame
-        count_occur_df : dataframe that holds the words and tf-idf values
     """
-    tfidf_vec = TfidfVectorizer(analyzer)
+    tfidf_vec = TfidfVectorizer(analyzer=analyzer)
     tfidf_count_occurs = tfidf_vec.fit_transform(train_data)
-    tfidf_count_occur_df = pd.DataFrame((count, word) for word, count in zip(tfidf_count_occurs.toarray().tolist()[0], tfidf_vec.get_feature_names()))
-    tfidf_count_occur_df.columns = ['Word', 'Count']
-    tfidf_count_occur_df.sort_values('Count', ascending=False, inplace=True)
-    return tfidf_vec, tfidf_count_occurs, tfidf_count_occur_df
+    return tfidf_vec, tfidf_count_occurs
+#%%
+def vocabulary_report(vector, matrix, statistic='sum'):
+    """Report the words of a fitted Vectorizer with their weights
+
+    Weights are computed from the sparse columns of `matrix` only when the
+    report is asked for.
+
+    Parameters
+    ----------
+    vector : Vectorizer
+        fitted count, norm_count or tf_idf vector
+    matrix : csr_matrix
+        matrix returned together with `vector`
+    statistic : str
+        sum : total weight of the word over all documents
+        df : number of documents that contain the word
+
+    Returns
+    -------
+    DataFrame
+        dataframe that holds the words and weights, highest weight first
+    """
+    if statistic == 'sum':
+        weights = np.asarray(matrix.sum(axis=0)).ravel()
+    elif statistic == 'df':
+        weights = np.diff(matrix.tocsc().indptr)
+    else:
+        raise ValueError('Statistic should be either sum or df')
+
+    words = np.empty(len(vector.vocabulary_), dtype=object)
+    words[list(vector.vocabulary_.values())] = list(vector.vocabulary_.keys())
+
+    report = pd.DataFrame({'Word': words, 'Count': weights})
+    report.sort_values('Count', ascending=False, inplace=True)
+    return report
 #%%
 def transform_matrix(vector, test_data):
     """Transform the Vectorizer with the given test data
@@ -165,7 +188,7 @@ def transform_matrix(vector, test_data):
     """
     return vector.transform(test_data)
 #%%
-def find_similar_paragraphs(n, vector1, vector2, passages):
+def find_similar_paragraphs(n, vector1, vector2, passages, passage_ids=None):
     """Compares 2 different vectors and find the most similar n paragraphs using cosine similarity
     Parameters
     ----------
@@ -176,31 +199,51 @@ def find_similar_paragraphs(n, vector1, vector2, passages):
     vector2: matrix
 
     passages : dict
+
+    passage_ids : numpy.ndarray
+        Optional, passage ID of each row of `vector2`; keys of `passages` when not given
     
     Returns
     -------
     list
-        similar_paragraphs
+        similar_paragraphs, n per row of `vector1`, most similar first
+    list
+        similar_paragraph_ids
     """
-    paragraphs = list(passages.values())
-
-    similar_paragraphs = []
-    similar_paragraph_ids = []
-    cosine_similarities = cosine_similarity(vector1, vector2)
-    inverse_passages = {value: key for key, value in passages.items()}
-    for idx, i in enumerate(cosine_similarities):
-        x = cosine_similarities[idx].argsort()[-n:]
-        for idx_ in x:
-            similar_paragraphs.append(paragraphs[idx_])
-            similar_paragraph_ids.append(inverse_passages[paragraphs[idx_]])
+    if passage_ids is None:
+        passage_ids = np.array(list(passages.keys()))
+
+    ids, scores = find_top_k(vector1, vector2, passage_ids, n)
+    similar_paragraph_ids = ids.ravel().tolist()
+    similar_paragraphs = [passages[id_] for id_ in similar_paragraph_ids]
     return similar_paragraphs, similar_paragraph_ids
 #%%
-def analysis(mode, train_data, test_data, passages, n, analyzer):
+def check_index(mode, index):
+    """Raise ValueError if `index` cannot serve `mode`
+
+    Parameters
+    ----------
+    mode : str
+        count, norm_count, tf_idf or bm25
+    index: RetrievalIndex or BM25Index
+    """
+    # Imported here, retrieval_index imports this module
+    from passage_retrieval.retrieval_index import RetrievalIndex
+
+    if mode == 'bm25':
+        if not isinstance(index, BM25Index):
+            raise ValueError('bm25 mode needs a BM25Index, got {}'.format(type(index).__name__))
+    elif not isinstance(index, RetrievalIndex):
+        raise ValueError('{} mode needs a RetrievalIndex, got {}'.format(mode, type(index).__name__))
+    elif index.mode != mode:
+        raise ValueError('{} mode needs a {} index, got a {} index'.format(mode, mode, index.mode))
+#%%
+def analysis(mode, train_data, test_data, passages, n, analyzer, index=None):
     """Builds model with given mode and perform analysis according to that mode.
     Parameters
     ----------
     mode : str
-        count, norm_count or tf_idf
+        count, norm_count, tf_idf or bm25
     train_data: str
         traning data in which train counts are calculated
     test_data: str
@@ -210,22 +253,39 @@ def analysis(mode, train_data, test_data, passages, n, analyzer):
         number of similar paragraphs
     analyzer: str
         creates word based or bigram based Vectorizer
+    index: RetrievalIndex or BM25Index
+        Optional, prebuilt index; `analyzer` and `train_data` are ignored when given.
+        A BM25Index for bm25, a RetrievalIndex built with `mode` otherwise
     Returns
     -------
     list
         similar_paragraphs
     """
-    if mode == 'count':  
-        vector, matrix, count_matrix_df = fit_count_occurence_matrix(train_data)
+    if index is not None:
+        check_index(mode, index)
+
+    if mode == 'bm25':
+        if index is None:
+            index = BM25Index.build(train_data, list(passages.keys()))
+        ids, scores = index.search(test_data, n)
+        similar_paragraph_ids = ids.ravel().tolist()
+        similar_paragraphs = [passages[id_] for id_ in similar_paragraph_ids]
+        return similar_paragraphs, similar_paragraph_ids
+
+    passage_ids = None
+    if index is not None:
+        vector, matrix, passage_ids = index.vector, index.matrix, index.passage_ids
+    elif mode == 'count':  
+        vector, matrix = fit_count_occurence_matrix(train_data)
     elif mode == 'norm_count':
-        vector, matrix, norm_count_matrix_df = fit_normalized_count_occurrence_matrix(train_data)
+        vector, matrix = fit_normalized_count_occurrence_matrix(train_data)
     elif mode == 'tf_idf':
-        vector, matrix, tf_idf_matrix_df = fit_tf_idf_matrix(train_data, analyzer)
+        vector, matrix = fit_tf_idf_matrix(train_data, analyzer)
     else:
-        raise ValueError('Mode should be either count, norm_count or tf_idf')
+        raise ValueError('Mode should be either count, norm_count, tf_idf or bm25')
         
     transformed_vector = transform_matrix(vector, test_data)
-    similar_paragraphs, similar_paragraph_ids = find_similar_paragraphs(n, transformed_vector, matrix, passages)
+    similar_paragraphs, similar_paragraph_ids = find_similar_paragraphs(n, transformed_vector, matrix, passages, passage_ids)
     return similar_paragraphs, similar_paragraph_ids
 #%% 
 if __name__ == "__main__":
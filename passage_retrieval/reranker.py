@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Passage reranker over a compact, vocabulary independent feature set
+"""
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from answer_extraction.question_processing import find_q_focus
+from answer_extraction.util import calculate_tree_similarity, compile_focus
+from passage_retrieval.tree_ensemble import TreeEnsemble
+
+FEATURE_NAMES = [
+    "bm25",
+    "tf_idf_cosine",
+    "lemma_overlap",
+    "focus_hits",
+    "tree_similarity",
+    "passage_length",
+]
+
+# Bumped whenever `PairFeatureExtractor.extract` computes a feature differently
+FEATURE_VERSION = 2
+
+#%%
+class PairFeatureExtractor(object):
+    """Feature Extractor for (question, passage) pairs
+
+    Every pair is described by `FEATURE_NAMES`, so the reranker input
+    width does not depend on the vocabulary.
+
+    Attributes
+    ----------
+    tf_idf_index: RetrievalIndex
+        tf-idf index over the passages
+    bm25_index: BM25Index
+        BM25 index over the passages
+    passages_stanford: dict
+        Passage ID and stanfordnlp.pipeline.doc.Document mapping
+    """
+    def __init__(self, tf_idf_index, bm25_index, passages_stanford):
+        self.tf_idf_index = tf_idf_index
+        self.bm25_index = bm25_index
+        self.passages_stanford = passages_stanford
+        self._passage_lemmas = {}
+
+    def passage_lemmas(self, passage_id):
+        """Lemma set and word count of a passage, computed once per passage
+
+        Parameters
+        ----------
+        passage_id: int
+
+        Returns
+        -------
+        tuple
+            set of lemmas, number of words
+        """
+        if passage_id not in self._passage_lemmas:
+            words = [word for sentence in self.passages_stanford[passage_id].sentences for word in sentence.words]
+            lemmas = {word.lemma.casefold() for word in words if word.lemma}
+            self._passage_lemmas[passage_id] = lemmas, len(words)
+        return self._passage_lemmas[passage_id]
+
+    def extract(self, question, parsed_question, passage_ids):
+        """Features of `question` paired with every passage of `passage_ids`
+
+        Parameters
+        ----------
+        question: str
+            Question
+        parsed_question: stanfordnlp.pipeline.doc.Document
+            Question
+        passage_ids: list
+            Candidate passage IDs
+
+        Returns
+        -------
+        numpy.ndarray
+            (len(passage_ids), len(FEATURE_NAMES)) features
+        """
+        question_lemmas = {word.lemma.casefold() for word in parsed_question.sentences[0].words
+                           if word.lemma and word.upos != "PUNCT"}
+        # Focus words are surface texts, passages are matched by lemma
+        focus = {lemma.casefold() for lemma in compile_focus(find_q_focus(parsed_question), parsed_question).weights}
+
+        features = np.zeros((len(passage_ids), len(FEATURE_NAMES)))
+        features[:, 0] = self.bm25_index.score(question, passage_ids)
+        features[:, 1] = self.tf_idf_index.score(question, passage_ids)
+        for i, passage_id in enumerate(passage_ids):
+            lemmas, length = self.passage_lemmas(passage_id)
+            passage = self.passages_stanford[passage_id]
+            features[i, 2] = len(question_lemmas & lemmas) / len(question_lemmas) if question_lemmas else 0
+            features[i, 3] = len(focus & lemmas)
+            features[i, 4] = max([calculate_tree_similarity(sentence, parsed_question)
+                                  for sentence in passage.sentences] or [0])
+            features[i, 5] = length
+        return features
+#%%
+def fit_reranker(X, y, **params):
+    """Fit the reranker
+
+    Parameters
+    ----------
+    X: numpy.ndarray
+        Pair features, see `FEATURE_NAMES`
+    y: numpy.ndarray
+        1 for the related passage, 0 otherwise
+    params:
+        XGBRegressor parameters
+
+    Returns
+    -------
+    XGBRegressor
+    """
+    import xgboost as xgb
+
+    xgb_model = xgb.XGBRegressor(**params)
+    xgb_model.fit(X, y)
+    return xgb_model
+#%%
+def load_reranker(file_path):
+    """Load a reranker saved with `save_model`
+
+    Parameters
+    ----------
+    file_path: str
+
+    Returns
+    -------
+    XGBRegressor
+    """
+    import xgboost as xgb
+
+    xgb_model = xgb.XGBRegressor()
+    xgb_model.load_model(file_path)
+    return xgb_model
+#%%
+def load_tree_ensemble(file_path):
+    """Load a reranker exported with `TreeEnsemble.save`
+
+    Scoring with it does not import xgboost.
+
+    Parameters
+    ----------
+    file_path: str
+
+    Returns
+    -------
+    TreeEnsemble
+    """
+    return TreeEnsemble.load(file_path)
+#%%
+def rerank(question, parsed_question, passage_ids, extractor, xgb_model):
+    """Order candidate passages by reranker score
+
+    Parameters
+    ----------
+    question: str
+    parsed_question: stanfordnlp.pipeline.doc.Document
+    passage_ids: list
+        Candidate passage IDs
+    extractor: PairFeatureExtractor
+    xgb_model: XGBRegressor or TreeEnsemble
+
+    Returns
+    -------
+    list
+        Passage IDs, best first
+    numpy.ndarray
+        Reranker scores in the same order
+    """
+    if not len(passage_ids):
+        return [], np.zeros(0)
+    scores = np.asarray(xgb_model.predict(extractor.extract(question, parsed_question, passage_ids)))
+    order = np.argsort(-scores, kind="mergesort")
+    return [passage_ids[i] for i in order], scores[order]
+#%%
+def predict_passage(question, parsed_question, extractor, xgb_model, n=15, cascade=None):
+    """Predict the passage of `question` by reranking first-stage tf-idf candidates
+
+    Parameters
+    ----------
+    question: str
+    parsed_question: stanfordnlp.pipeline.doc.Document
+    extractor: PairFeatureExtractor
+    xgb_model: XGBRegressor or TreeEnsemble
+    n: int
+        number of candidates reranked
+    cascade: AdaptiveDepth
+        Optional, chooses the number of candidates instead of `n`
+
+    Returns
+    -------
+    int
+        Passage ID
+    """
+    ids, scores = extractor.tf_idf_index.search([question], n if cascade is None else cascade.k_max)
+    depth = ids.shape[1] if cascade is None else cascade.choose_depths(scores)[0]
+    ranked_ids, ranked_scores = rerank(question, parsed_question, ids[0, :depth].tolist(), extractor, xgb_model)
+    return ranked_ids[0]
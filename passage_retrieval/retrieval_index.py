@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fit-once retrieval index over the passages
+"""
+import hashlib
+import pickle
+import sys
+sys.path.append("..")
+
+import numpy as np
+
+from sklearn.preprocessing import normalize
+
+from passage_retrieval.paragraph_prediction import (fit_count_occurence_matrix,
+                                                    fit_normalized_count_occurrence_matrix,
+                                                    fit_tf_idf_matrix,
+                                                    load_passages,
+                                                    transform_matrix)
+from passage_retrieval.top_k import find_top_k
+
+#%%
+def passages_fingerprint(passages):
+    """Content hash of the passage IDs and texts, in order
+
+    Parameters
+    ----------
+    passages: dict
+        dictionary of passages with ID and passage mapping
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.sha1()
+    for passage_id, passage in passages.items():
+        digest.update("{}\0{}\0".format(passage_id, passage).encode("utf-8"))
+    return digest.hexdigest()
+#%%
+class RetrievalIndex(object):
+    """Retrieval Index
+
+    Holds a vectorizer fitted once over every passage together with the
+    passage matrix, so queries only need to be transformed and scored.
+
+    Attributes
+    ----------
+    mode: str
+        count, norm_count or tf_idf
+    analyzer: str
+        word based or bigram based Vectorizer
+    vector: Vectorizer
+        Fitted vectorizer
+    matrix: csr_matrix
+        Passage matrix, one row per passage
+    passage_ids: numpy.ndarray
+        Passage ID of each row of `matrix`
+    fingerprint: str
+        Fingerprint of the passages the index was built from, see `passages_fingerprint`
+    """
+    def __init__(self, mode, analyzer, vector, matrix, passage_ids, fingerprint=None):
+        self.mode = mode
+        self.analyzer = analyzer
+        self.vector = vector
+        self.matrix = matrix
+        self.passage_ids = np.asarray(passage_ids)
+        self.fingerprint = fingerprint
+        self.rows = {passage_id: row for row, passage_id in enumerate(self.passage_ids.tolist())}
+        self._normalized_matrix = None
+
+    @classmethod
+    def build(cls, passages, mode="tf_idf", analyzer="word"):
+        """Fit the index
+
+        Parameters
+        ----------
+        passages: dict
+            dictionary of passages with ID and passage mapping
+        mode: str
+            count, norm_count or tf_idf
+        analyzer: str
+            creates word based or bigram based Vectorizer
+
+        Returns
+        -------
+        RetrievalIndex
+        """
+        passage_ids = list(passages.keys())
+        passage_pars = list(passages.values())
+        if mode == 'count':
+            vector, matrix = fit_count_occurence_matrix(passage_pars)
+        elif mode == 'norm_count':
+            vector, matrix = fit_normalized_count_occurrence_matrix(passage_pars)
+        elif mode == 'tf_idf':
+            vector, matrix = fit_tf_idf_matrix(passage_pars, analyzer)
+        else:
+            raise ValueError('Mode should be either count, norm_count or tf_idf')
+        return cls(mode, analyzer, vector, matrix.tocsr(), passage_ids, passages_fingerprint(passages))
+
+    def matches(self, passages, mode="tf_idf", analyzer="word", fingerprint=None):
+        """Whether the index was built from `passages` with `mode` and `analyzer`
+
+        Parameters
+        ----------
+        passages: dict
+            dictionary of passages with ID and passage mapping
+        mode: str
+        analyzer: str
+        fingerprint: str
+            Optional, fingerprint of `passages` if it is already computed
+
+        Returns
+        -------
+        bool
+        """
+        if fingerprint is None:
+            fingerprint = passages_fingerprint(passages)
+        return (self.mode, self.analyzer) == (mode, analyzer) \
+            and getattr(self, "fingerprint", None) == fingerprint
+
+    def transform(self, texts):
+        """Transform texts with the fitted vectorizer
+
+        Parameters
+        ----------
+        texts: list
+            list of str
+
+        Returns
+        -------
+        csr_matrix
+        """
+        return transform_matrix(self.vector, texts)
+
+    def search(self, texts, n, chunk_size=256):
+        """Find the most similar n passages of every text
+
+        Parameters
+        ----------
+        texts: list
+            list of str
+        n: int
+            number of similar passages
+        chunk_size: int
+            number of texts scored at once
+
+        Returns
+        -------
+        numpy.ndarray
+            ids : (len(texts), n) passage IDs, most similar first
+        numpy.ndarray
+            scores : (len(texts), n) cosine similarities
+        """
+        return find_top_k(normalize(self.transform(texts)), self.normalized_matrix(),
+                          self.passage_ids, n, chunk_size, normalized=True)
+
+    def score(self, text, passage_ids):
+        """Cosine similarities of given passages to `text`
+
+        Parameters
+        ----------
+        text: str
+        passage_ids: list
+
+        Returns
+        -------
+        numpy.ndarray
+            scores
+        """
+        rows = [self.rows[passage_id] for passage_id in passage_ids]
+        query = normalize(self.transform([text]))
+        return np.asarray(self.normalized_matrix()[rows].dot(query.T).todense()).ravel()
+
+    def normalized_matrix(self):
+        """Passage matrix with l2 normalized rows, computed once
+
+        Returns
+        -------
+        csr_matrix
+        """
+        if self._normalized_matrix is None:
+            self._normalized_matrix = normalize(self.matrix)
+        return self._normalized_matrix
+
+    def passage_vectors(self, passage_ids):
+        """Rows of the passage matrix for given passage IDs
+
+        Parameters
+        ----------
+        passage_ids: list
+
+        Returns
+        -------
+        csr_matrix
+        """
+        return self.matrix[[self.rows[passage_id] for passage_id in passage_ids]]
+
+    def save(self, file_path):
+        normalized_matrix, self._normalized_matrix = self._normalized_matrix, None
+        with open(file_path, "wb") as f:
+            pickle.dump(self, f)
+        self._normalized_matrix = normalized_matrix
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path, "rb") as f:
+            return pickle.load(f)
+
+
+def load_or_build_index(file_path, passages, mode="tf_idf", analyzer="word"):
+    """Load the index from `file_path`, building and saving it when missing
+
+    A saved index is rebuilt when it cannot be read, e.g. it is corrupt or
+    was pickled by an incompatible sklearn, or when it was built from other
+    passages, e.g. after derlem.txt changed, or with another mode or
+    analyzer. A rebuilt index that cannot be saved, e.g. to a read-only
+    directory, is still returned.
+
+    Parameters
+    ----------
+    file_path: str
+        Path of the index pickle
+    passages: dict
+        dictionary of passages with ID and passage mapping
+    mode: str
+        count, norm_count or tf_idf
+    analyzer: str
+        creates word based or bigram based Vectorizer
+
+    Returns
+    -------
+    RetrievalIndex
+    """
+    try:
+        index = RetrievalIndex.load(file_path)
+    except Exception:
+        index = None
+
+    if not isinstance(index, RetrievalIndex) or not index.matches(passages, mode, analyzer):
+        index = RetrievalIndex.build(passages, mode, analyzer)
+        try:
+            index.save(file_path)
+        except OSError as e:
+            print("Could not save retrieval index: {}".format(e))
+    return index
+#%%
+if __name__ == "__main__":
+    passages = load_passages("../preprocessed_data/passages.pickle")
+    index = RetrievalIndex.build(passages, mode='tf_idf', analyzer='word')
+    index.save("../preprocessed_data/retrieval_index.pickle")
@@ -5,38 +5,188 @@ Created on Sat May 25 17:49:22 2019
 
 @author: starlang
 """
+import os
 import pickle
 import numpy as np
 import xgboost as xgb
 
+from scipy.sparse import coo_matrix, hstack
+
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
 
-from passage_retrieval.paragraph_prediction import (find_similar_paragraphs,
-                                                    fit_tf_idf_matrix,
-                                                    retrieve_questions,
-                                                    transform_matrix)
+from passage_retrieval.paragraph_prediction import retrieve_questions
+from passage_retrieval.retrieval_index import load_or_build_index
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessed_data", "retrieval_index.pickle")
+
+_indexes = {}
+#%%
+def default_index(passages, file_path=INDEX_PATH):
+    """tf-idf index over `passages`, loaded or built once per passages dict
+
+    The index is saved to `file_path` and rebuilt there when the passages
+    no longer match it, see `load_or_build_index`. The index kept in memory
+    is checked against the fingerprint of `passages` on every call, so a
+    dict changed in place gets a rebuilt index too.
+
+    Parameters
+    ----------
+    passages: dict
+        dictionary of passages with ID and passage mapping
+    file_path: str
+        Path of the index pickle
+
+    Returns
+    -------
+    RetrievalIndex
+    """
+    key = (id(passages), file_path)
+    entry = _indexes.get(key)
+    if entry is None or not entry[1].matches(passages, mode='tf_idf', analyzer='word'):
+        # passages is kept so its id is not reused while the entry exists
+        entry = passages, load_or_build_index(file_path, passages, mode='tf_idf', analyzer='word')
+        _indexes[key] = entry
+    return entry[1]
+#%%
+def model_split_features(xgb_model):
+    """Find the features that the trees of `xgb_model` split on
+
+    Parameters
+    ----------
+    xgb_model: XGBRegressor
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted column indices
+    """
+    booster = xgb_model.get_booster()
+    used = booster.get_score(importance_type='weight')
+    if booster.feature_names:
+        columns = {name: i for i, name in enumerate(booster.feature_names)}
+        return np.array(sorted(columns[name] for name in used), dtype=np.int64)
+    return np.array(sorted(int(name[1:]) for name in used), dtype=np.int64)
+
+
+def cached_split_features(xgb_model):
+    """`model_split_features` of `xgb_model`, computed once per fitted booster
+
+    The features are kept on the model with the booster they were read
+    from, so they are recomputed after the model is fit again.
+
+    Parameters
+    ----------
+    xgb_model: XGBRegressor
 
+    Returns
+    -------
+    numpy.ndarray
+        Sorted column indices
+    """
+    booster = xgb_model.get_booster()
+    cached = getattr(xgb_model, "_split_features", None)
+    if cached is None or cached[0] is not booster:
+        cached = booster, model_split_features(xgb_model)
+        xgb_model._split_features = cached
+    return cached[1]
 #%%
-def predict_passage(question, passages, xgb_model):
-    passage_pars = list(passages.values())
-    
-    X_vector, X_matrix, X_tf_idf_matrix_df = fit_tf_idf_matrix(passage_pars, 'word')
-    
-    whole_test = []
-    tf_idf_questions = transform_matrix(X_vector, [question])
-    similar_paragraphs, similar_paragraph_ids = find_similar_paragraphs(15, tf_idf_questions, X_matrix, passages)
-    for s in similar_paragraph_ids:
-        tf_idf_pars = transform_matrix(X_vector, [passages[s]])
-        whole_matrix = np.concatenate((tf_idf_questions.todense(), tf_idf_pars.todense()), axis = 1)
-        whole_test.append(whole_matrix)
-        
-    X_test = np.array(whole_test)
-    nsamples_X_test, nx_X_test, ny_X_test = X_test.shape
-    d2_X_test_dataset = X_test.reshape((nsamples_X_test,nx_X_test * ny_X_test))
-    
-    xgb_pred = xgb_model.predict(d2_X_test_dataset)
-    
-    y_pred_max = np.argmax(xgb_pred)
-    
-    return similar_paragraph_ids[y_pred_max]
+def build_candidate_matrix(question_vectors, passage_vectors, split_features=None):
+    """Build reranker rows of (question, candidate passage) pairs
+
+    Row i is question_vectors[i] followed by passage_vectors[i]. XGBoost reads
+    entries missing from a sparse matrix as missing values, not as 0, so the
+    columns in `split_features` are stored with explicit zeros to score the
+    same as the dense rows the reranker was trained on. Memory grows with the
+    nonzeros and the split features, not with the vocabulary.
+
+    Parameters
+    ----------
+    question_vectors: csr_matrix
+        One row per pair
+    passage_vectors: csr_matrix
+        One row per pair
+    split_features: numpy.ndarray
+        Optional, columns to store explicitly; see `model_split_features`
+
+    Returns
+    -------
+    csr_matrix
+    """
+    pairs = hstack([question_vectors, passage_vectors], format='coo')
+    if split_features is None or not len(split_features):
+        return pairs.tocsr()
+
+    n_rows = pairs.shape[0]
+    rows = np.concatenate((pairs.row, np.repeat(np.arange(n_rows), len(split_features))))
+    cols = np.concatenate((pairs.col, np.tile(split_features, n_rows)))
+    data = np.concatenate((pairs.data, np.zeros(n_rows * len(split_features), dtype=pairs.data.dtype)))
+    return coo_matrix((data, (rows, cols)), shape=pairs.shape).tocsr()
+#%%
+def predict_passages(questions, passages, xgb_model, index=None, n=15, cascade=None, split_features=None):
+    """Predict the passages of many questions with one reranker call
+
+    Parameters
+    ----------
+    questions: list
+        list of str
+    passages: dict
+        dictionary of passages with ID and passage mapping
+    xgb_model: XGBRegressor
+        Reranker over question and passage tf-idf vectors
+    index: RetrievalIndex
+        Optional, tf-idf index over `passages`; see `default_index` when not given
+    n: int
+        number of candidates reranked per question
+    cascade: AdaptiveDepth
+        Optional, chooses the number of candidates per question instead of `n`
+    split_features: numpy.ndarray
+        Optional, see `model_split_features`; cached on `xgb_model` when not given
+
+    Returns
+    -------
+    list
+        Passage IDs
+    """
+    if index is None:
+        index = default_index(passages)
+    if split_features is None:
+        split_features = cached_split_features(xgb_model)
+    if not len(questions):
+        return []
+
+    ids, scores = index.search(questions, n if cascade is None else cascade.k_max)
+    if cascade is None:
+        depths = np.full(len(questions), ids.shape[1])
+    else:
+        depths = cascade.choose_depths(scores)
+    offsets = np.concatenate(([0], np.cumsum(depths)))
+
+    candidate_ids = [id_ for row, depth in zip(ids.tolist(), depths) for id_ in row[:depth]]
+    question_vectors = index.transform(questions)[np.repeat(np.arange(len(questions)), depths)]
+    passage_vectors = index.passage_vectors(candidate_ids)
+    X_test = build_candidate_matrix(question_vectors, passage_vectors, split_features)
+
+    xgb_pred = np.asarray(xgb_model.predict(X_test))
+
+    return [candidate_ids[start + np.argmax(xgb_pred[start:end])] for start, end in zip(offsets[:-1], offsets[1:])]
+#%%
+def predict_passage(question, passages, xgb_model, index=None):
+    """Predict the passage of `question`
+
+    Parameters
+    ----------
+    question: str
+    passages: dict
+        dictionary of passages with ID and passage mapping
+    xgb_model: XGBRegressor
+        Reranker over question and passage tf-idf vectors
+    index: RetrievalIndex
+        Optional, tf-idf index over `passages`; see `default_index` when not given
+
+    Returns
+    -------
+    int
+        Passage ID
+    """
+    return predict_passages([question], passages, xgb_model, index)[0]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Top-k cosine retrieval with partial selection
+"""
+import numpy as np
+
+from scipy.sparse import issparse
+from sklearn.preprocessing import normalize
+
+#%%
+def find_top_k(query_matrix, passage_matrix, passage_ids, k, chunk_size=256, normalized=False):
+    """Find the k most similar passages of every query using cosine similarity
+
+    Queries are scored `chunk_size` rows at a time, so at most a
+    chunk_size x passages dense block is held in memory, and only the top
+    k columns of each row are sorted.
+
+    Parameters
+    ----------
+    query_matrix: csr_matrix
+        Transformed queries, one row per query
+    passage_matrix: csr_matrix
+        Passage matrix, one row per passage
+    passage_ids: numpy.ndarray
+        Passage ID of each row of `passage_matrix`
+    k: int
+        number of similar passages
+    chunk_size: int
+        number of queries scored at once
+    normalized: bool
+        True if rows of both matrices are already l2 normalized
+
+    Returns
+    -------
+    numpy.ndarray
+        ids : (n_queries, k) passage IDs, most similar first
+    numpy.ndarray
+        scores : (n_queries, k) cosine similarities
+    """
+    passage_ids = np.asarray(passage_ids)
+    if not normalized:
+        query_matrix = normalize(query_matrix)
+        passage_matrix = normalize(passage_matrix)
+
+    n_queries = query_matrix.shape[0]
+    k = min(k, passage_matrix.shape[0])
+    ids = np.empty((n_queries, k), dtype=passage_ids.dtype)
+    scores = np.empty((n_queries, k))
+    if k == 0:
+        return ids, scores
+    passage_matrix_t = passage_matrix.T
+
+    for start in range(0, n_queries, chunk_size):
+        end = min(start + chunk_size, n_queries)
+        similarities = query_matrix[start:end].dot(passage_matrix_t)
+        if issparse(similarities):
+            similarities = similarities.toarray()
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="mergesort")
+        top = np.take_along_axis(top, order, axis=1)
+        ids[start:end] = passage_ids[top]
+        scores[start:end] = np.take_along_axis(top_scores, order, axis=1)
+
+    return ids, scores
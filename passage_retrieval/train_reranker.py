@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Training pipeline for the passage reranker
+
+Run from this directory after preprocessing:
+
+    python train_reranker.py
+"""
+import hashlib
+import os
+import sys
+import time
+from multiprocessing import Pool, cpu_count
+sys.path.append("..")
+
+import numpy as np
+
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score
+
+from passage_retrieval.bm25 import BM25Index
+from passage_retrieval.paragraph_prediction import (load_passages,
+                                                    load_question_groups,
+                                                    retrieve_questions)
+from passage_retrieval.reranker import (FEATURE_NAMES,
+                                        FEATURE_VERSION,
+                                        PairFeatureExtractor,
+                                        fit_reranker)
+from passage_retrieval.retrieval_index import RetrievalIndex
+from passage_retrieval.tree_ensemble import TreeEnsemble, max_abs_difference
+
+#%%
+def generate_pairs(question_groups, extractor, n=15):
+    """Generate candidate pairs of every question
+
+    Candidates are the top `n` tf-idf passages plus the related passage; the
+    related passage is the positive pair and the others are negatives.
+
+    Parameters
+    ----------
+    question_groups: list
+        list of QuestionGroups with parsed questions
+    extractor: PairFeatureExtractor
+    n: int
+        number of retrieved candidates per question
+
+    Returns
+    -------
+    list
+        (question ID, question, parsed question, candidate IDs, labels) tuples
+    """
+    parsed_questions = {question.idx: question.text for qg in question_groups for question in qg.questions}
+    question_answer = [qa for qa in retrieve_questions(question_groups)
+                       if qa['rel_par'] in extractor.passages_stanford]
+    if not question_answer:
+        return []
+
+    ids, scores = extractor.tf_idf_index.search([qa['q'] for qa in question_answer], n)
+    pairs = []
+    for qa, candidates in zip(question_answer, ids.tolist()):
+        if qa['rel_par'] not in candidates:
+            candidates.append(qa['rel_par'])
+        labels = [int(candidate == qa['rel_par']) for candidate in candidates]
+        pairs.append((qa['q_id'], qa['q'], parsed_questions[qa['q_id']], candidates, labels))
+    return pairs
+#%%
+_worker_extractor = None
+
+
+def _init_worker(extractor):
+    global _worker_extractor
+    _worker_extractor = extractor
+
+
+def _extract_pair(pair):
+    q_id, question, parsed_question, candidates, labels = pair
+    return _worker_extractor.extract(question, parsed_question, candidates)
+
+
+def extract_features(pairs, extractor, n_jobs=None):
+    """Compute features of every pair over `n_jobs` processes
+
+    Parameters
+    ----------
+    pairs: list
+        output of `generate_pairs`
+    extractor: PairFeatureExtractor
+    n_jobs: int
+        number of processes; all cores when not given
+
+    Returns
+    -------
+    numpy.ndarray
+        X : features
+    numpy.ndarray
+        y : labels
+    numpy.ndarray
+        groups : row index of each question's first candidate, plus the total row count
+    """
+    n_jobs = n_jobs or cpu_count()
+    if n_jobs > 1:
+        with Pool(n_jobs, initializer=_init_worker, initargs=(extractor,)) as pool:
+            features = pool.map(_extract_pair, pairs, chunksize=max(1, len(pairs) // (4 * n_jobs)))
+    else:
+        _init_worker(extractor)
+        features = [_extract_pair(pair) for pair in pairs]
+
+    X = np.vstack(features) if features else np.zeros((0, len(FEATURE_NAMES)))
+    y = np.array([label for pair in pairs for label in pair[4]], dtype=np.float64)
+    groups = np.cumsum([0] + [len(pair[3]) for pair in pairs])
+    return X, y, groups
+#%%
+def cache_key(pairs, extractor):
+    """Key of the features of `pairs`
+
+    Changes when questions, candidates, candidate passage texts, the
+    passages of the tf-idf index or the feature code change.
+
+    Parameters
+    ----------
+    pairs: list
+        output of `generate_pairs`
+    extractor: PairFeatureExtractor
+
+    Returns
+    -------
+    str
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((FEATURE_VERSION, FEATURE_NAMES,
+                        getattr(extractor.tf_idf_index, "fingerprint", None))).encode("utf-8"))
+    passage_hashes = {}
+    for pair in pairs:
+        for candidate in pair[3]:
+            if candidate not in passage_hashes:
+                text = extractor.passages_stanford[candidate].text
+                passage_hashes[candidate] = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        content = repr((pair[0], pair[1], [(candidate, passage_hashes[candidate]) for candidate in pair[3]]))
+        digest.update(content.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_or_extract_features(cache_path, pairs, extractor, n_jobs=None):
+    """Load pair features from `cache_path`, extracting and caching them when stale
+
+    Parameters
+    ----------
+    cache_path: str
+        Path of the .npz feature cache
+    pairs: list
+        output of `generate_pairs`
+    extractor: PairFeatureExtractor
+    n_jobs: int
+        number of processes; all cores when not given
+
+    Returns
+    -------
+    tuple
+        X, y, groups
+    """
+    key = cache_key(pairs, extractor)
+    if os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        if str(cached["key"]) == key:
+            print("Loaded cached features: {}".format(cache_path))
+            return cached["X"], cached["y"], cached["groups"]
+
+    start = time.time()
+    X, y, groups = extract_features(pairs, extractor, n_jobs)
+    elapsed = time.time() - start
+    print("Extracted {} pairs of {} questions in {:.1f}s ({:.1f} pairs/sec)".format(
+        len(y), len(pairs), elapsed, len(y) / elapsed if elapsed else float("inf")))
+
+    np.savez(cache_path, key=key, X=X, y=y, groups=groups)
+    return X, y, groups
+#%%
+def top1_accuracy(xgb_model, X, y, groups):
+    """Fraction of questions whose best scored candidate is the related passage"""
+    scores = xgb_model.predict(X)
+    pred, true = [], []
+    for start, end in zip(groups[:-1], groups[1:]):
+        pred.append(int(np.argmax(scores[start:end])))
+        true.append(int(np.argmax(y[start:end])))
+    return accuracy_score(true, pred)
+
+
+def train(pairs, X, y, groups, test_size=0.2, random_state=0, **params):
+    """Train the reranker on a question-level split and report throughput
+
+    Parameters
+    ----------
+    pairs: list
+        output of `generate_pairs`
+    X, y, groups:
+        output of `load_or_extract_features`
+    test_size: float
+        fraction of questions held out
+    random_state: int
+    params:
+        XGBRegressor parameters
+
+    Returns
+    -------
+    XGBRegressor
+    """
+    params.setdefault("n_jobs", -1)
+    params.setdefault("random_state", random_state)
+
+    question_idx = np.arange(len(pairs))
+    train_idx, test_idx = train_test_split(question_idx, test_size=test_size, random_state=random_state)
+
+    def rows(idx):
+        return np.concatenate([np.arange(groups[i], groups[i + 1]) for i in idx])
+
+    def sub_groups(idx):
+        return np.cumsum([0] + [groups[i + 1] - groups[i] for i in idx])
+
+    train_rows, test_rows = rows(train_idx), rows(test_idx)
+
+    start = time.time()
+    xgb_model = fit_reranker(X[train_rows], y[train_rows], **params)
+    elapsed = time.time() - start
+    print("Trained on {} rows in {:.1f}s ({:.1f} rows/sec)".format(
+        len(train_rows), elapsed, len(train_rows) / elapsed if elapsed else float("inf")))
+    print("Held-out top-1 accuracy: {:.4f}".format(
+        top1_accuracy(xgb_model, X[test_rows], y[test_rows], sub_groups(test_idx))))
+
+    return xgb_model
+#%%
+if __name__ == "__main__":
+    passages = load_passages("../preprocessed_data/passages.pickle")
+    passages_stanford = load_passages("../preprocessed_data/passages_stanford.pickle")
+    question_groups = load_question_groups("../preprocessed_data/question_groups_stanford.pickle")
+
+    tf_idf_index = RetrievalIndex.build(passages, mode='tf_idf', analyzer='word')
+    bm25_index = BM25Index.build(list(passages.values()), list(passages.keys()))
+    extractor = PairFeatureExtractor(tf_idf_index, bm25_index, passages_stanford)
+
+    pairs = generate_pairs(question_groups, extractor, n=15)
+    X, y, groups = load_or_extract_features("../preprocessed_data/reranker_features.npz", pairs, extractor)
+
+    xgb_model = train(pairs, X, y, groups)
+    xgb_model.save_model("../reranker.model")
+
+    ensemble = TreeEnsemble.from_xgb_model(xgb_model)
+    print("TreeEnsemble max abs difference: {:.2e}".format(max_abs_difference(ensemble, xgb_model, X)))
+    ensemble.save("../reranker_trees.npz")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pure NumPy evaluator for exported XGBoost tree ensembles
+"""
+import json
+
+import numpy as np
+
+OBJECTIVES = ["reg:squarederror", "reg:linear", "reg:logistic", "binary:logistic"]
+
+#%%
+class TreeEnsemble(object):
+    """Tree Ensemble
+
+    Every node of every tree is stored in flat arrays, so a batch of rows is
+    scored by walking all trees one level at a time with vectorized lookups.
+    Rows go to the `left` child when value < threshold, to `missing` when the
+    value is NaN and to `right` otherwise, as in XGBoost.
+
+    Attributes
+    ----------
+    feature: numpy.ndarray
+        Split feature of every node, -1 for leaves
+    threshold: numpy.ndarray
+        Split threshold of every node
+    left: numpy.ndarray
+        Left child of every node
+    right: numpy.ndarray
+        Right child of every node
+    missing: numpy.ndarray
+        Child taken by missing values
+    value: numpy.ndarray
+        Leaf value of every node, 0 for splits
+    roots: numpy.ndarray
+        Root node of every tree
+    base_score: float
+    objective: str
+    """
+    def __init__(self, feature, threshold, left, right, missing, value, roots, base_score, objective):
+        if objective not in OBJECTIVES:
+            raise ValueError("Objective should be one of {}".format(", ".join(OBJECTIVES)))
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing = missing
+        self.value = value
+        self.roots = roots
+        self.base_score = float(base_score)
+        self.objective = objective
+        self.max_depth = self._max_depth()
+
+    def _max_depth(self):
+        depth = np.zeros(len(self.feature), dtype=np.int32)
+        for node in range(len(self.feature)):
+            if self.feature[node] >= 0:
+                depth[self.left[node]] = depth[self.right[node]] = depth[node] + 1
+        return int(depth.max()) if len(depth) else 0
+
+    @classmethod
+    def from_xgb_model(cls, xgb_model):
+        """Export a trained XGBRegressor or Booster
+
+        Parameters
+        ----------
+        xgb_model: XGBRegressor or Booster
+
+        Returns
+        -------
+        TreeEnsemble
+        """
+        booster = xgb_model.get_booster() if hasattr(xgb_model, "get_booster") else xgb_model
+        columns = {name: i for i, name in enumerate(booster.feature_names or [])}
+
+        feature, threshold, left, right, missing, value, roots = [], [], [], [], [], [], []
+        for dump in booster.get_dump(dump_format="json"):
+            offset = len(feature)
+            roots.append(offset)
+            nodes = {}
+            stack = [json.loads(dump)]
+            while stack:
+                node = stack.pop()
+                nodes[node["nodeid"]] = node
+                stack.extend(node.get("children", []))
+            for node_id in range(len(nodes)):
+                node = nodes[node_id]
+                if "leaf" in node:
+                    feature.append(-1)
+                    threshold.append(0.)
+                    left.append(offset + node_id)
+                    right.append(offset + node_id)
+                    missing.append(offset + node_id)
+                    value.append(node["leaf"])
+                else:
+                    split = node["split"]
+                    feature.append(columns[split] if split in columns else int(split[1:]))
+                    threshold.append(node["split_condition"])
+                    left.append(offset + node["yes"])
+                    right.append(offset + node["no"])
+                    missing.append(offset + node["missing"])
+                    value.append(0.)
+
+        config = json.loads(booster.save_config())
+        base_score = config["learner"]["learner_model_param"]["base_score"].strip("[]")
+        objective = config["learner"]["objective"]["name"]
+
+        return cls(np.array(feature, dtype=np.int32),
+                   np.array(threshold, dtype=np.float32),
+                   np.array(left, dtype=np.int32),
+                   np.array(right, dtype=np.int32),
+                   np.array(missing, dtype=np.int32),
+                   np.array(value, dtype=np.float32),
+                   np.array(roots, dtype=np.int32),
+                   float(base_score), objective)
+
+    def predict(self, X):
+        """Score rows
+
+        Parameters
+        ----------
+        X: numpy.ndarray
+            (n_rows, n_features) features, NaN for missing values
+
+        Returns
+        -------
+        numpy.ndarray
+            Predictions, same as XGBRegressor.predict
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.tile(self.roots, (X.shape[0], 1))
+
+        for _ in range(self.max_depth):
+            feature = self.feature[nodes]
+            values = X[rows, np.maximum(feature, 0)]
+            children = np.where(values < self.threshold[nodes], self.left[nodes], self.right[nodes])
+            children = np.where(np.isnan(values), self.missing[nodes], children)
+            nodes = np.where(feature < 0, nodes, children)
+
+        margin = self.value[nodes].sum(axis=1, dtype=np.float32)
+        if self.objective in ("reg:logistic", "binary:logistic"):
+            margin = margin + np.float32(np.log(self.base_score / (1. - self.base_score)))
+            return (1. / (1. + np.exp(-margin))).astype(np.float32)
+        return margin + np.float32(self.base_score)
+
+    def save(self, file_path):
+        np.savez(file_path, feature=self.feature, threshold=self.threshold, left=self.left,
+                 right=self.right, missing=self.missing, value=self.value, roots=self.roots,
+                 base_score=self.base_score, objective=self.objective)
+
+    @classmethod
+    def load(cls, file_path):
+        arrays = np.load(file_path)
+        return cls(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                   arrays["missing"], arrays["value"], arrays["roots"],
+                   float(arrays["base_score"]), str(arrays["objective"]))
+#%%
+def max_abs_difference(ensemble, xgb_model, X):
+    """Largest difference between `ensemble` and `xgb_model` predictions on `X`
+
+    Parameters
+    ----------
+    ensemble: TreeEnsemble
+    xgb_model: XGBRegressor
+    X: numpy.ndarray
+
+    Returns
+    -------
+    float
+    """
+    if not len(X):
+        return 0.
+    return float(np.abs(ensemble.predict(X) - xgb_model.predict(np.asarray(X, dtype=np.float32))).max())
@@ -0,0 +1,69 @@
+import hashlib
+import os
+import pickle
+
+
+class AnnotationCache(object):
+    """Annotation Cache
+
+    Content-addressed store of annotated texts on disk. Every text is
+    keyed by the hash of its content and the pipeline config and kept in
+    its own pickle, so adding entries never rewrites existing ones.
+
+    Attributes
+    ----------
+    path: str
+        Directory of the cache
+    config: str
+        Pipeline config that annotations depend on, e.g. the language
+    """
+    def __init__(self, path, config="tr"):
+        self.path = path
+        self.config = config
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, text):
+        """Content hash of `text` under this cache's config"""
+        return hashlib.sha1("{}\0{}".format(self.config, text).encode("utf-8")).hexdigest()
+
+    def _file_path(self, key):
+        return os.path.join(self.path, key[:2], key + ".pickle")
+
+    def get(self, text):
+        """Annotation of `text`, None if it is not cached"""
+        try:
+            with open(self._file_path(self.key(text)), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def put(self, text, document):
+        """Cache the annotation of `text`"""
+        file_path = self._file_path(self.key(text))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(file_path, os.getpid())
+        with open(tmp_path, "wb") as f:
+            pickle.dump(document, f)
+        os.replace(tmp_path, file_path)
+
+    def prune(self, texts):
+        """Delete every entry except the annotations of `texts`
+
+        Parameters
+        ----------
+        texts: iterable
+            Texts whose annotations are kept
+
+        Returns
+        -------
+        int
+            Number of deleted entries
+        """
+        keep = {self.key(text) + ".pickle" for text in texts}
+        deleted = 0
+        for directory, _, file_names in os.walk(self.path):
+            for file_name in file_names:
+                if file_name.endswith(".pickle") and file_name not in keep:
+                    os.remove(os.path.join(directory, file_name))
+                    deleted += 1
+        return deleted
@@ -0,0 +1,298 @@
+import json
+import os
+import pickle
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+FIELDS = ["text", "lemma", "upos", "feats", "dependency_relation"]
+
+
+class WordView(object):
+    """Word View
+
+    Read-only word with the attributes of stanfordnlp.pipeline.doc.Word
+    that answer extraction uses
+    """
+    __slots__ = ("index", "text", "lemma", "upos", "feats", "governor", "dependency_relation")
+
+    def __init__(self, index, text, lemma, upos, feats, governor, dependency_relation):
+        self.index = index
+        self.text = text
+        self.lemma = lemma
+        self.upos = upos
+        self.feats = feats
+        self.governor = governor
+        self.dependency_relation = dependency_relation
+
+
+class SentenceView(object):
+    """Sentence View
+
+    Words are decoded from the store on first access
+    """
+    def __init__(self, store, start, end):
+        self._store = store
+        self._start = start
+        self._end = end
+        self._words = None
+
+    @property
+    def words(self):
+        if self._words is None:
+            self._words = self._store.decode_words(self._start, self._end)
+        return self._words
+
+
+class DocumentView(object):
+    """Document View
+
+    Passage with the `text` and `sentences` of stanfordnlp.pipeline.doc.Document
+    """
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+        self._sentences = None
+
+    @property
+    def text(self):
+        return self._store.passage_text(self._row)
+
+    @property
+    def sentences(self):
+        if self._sentences is None:
+            offsets = self._store.sentence_offsets
+            first, last = self._store.passage_offsets[self._row], self._store.passage_offsets[self._row + 1]
+            self._sentences = [SentenceView(self._store, int(offsets[i]), int(offsets[i + 1]))
+                               for i in range(first, last)]
+        return self._sentences
+
+
+class AnnotationStore(Mapping):
+    """Annotation Store
+
+    Columnar store of annotated passages. String attributes of every word
+    are interned into integer ids, so the whole corpus is a handful of
+    NumPy arrays plus one vocabulary per attribute. Passages are read as
+    `DocumentView`s, which answer extraction consumes like stanfordnlp
+    Documents.
+
+    A loaded store memory-maps its arrays, so only the pages of passages
+    that are read are touched and processes share them through the page
+    cache. The last `cache_size` passages read are kept decoded.
+
+    Attributes
+    ----------
+    passage_ids: numpy.ndarray
+        Passage ID of every row
+    sorted_ids: numpy.ndarray
+        Passage IDs in ascending order, the passage ID index
+    sorted_rows: numpy.ndarray
+        Row of every ID of `sorted_ids`
+    passage_offsets: numpy.ndarray
+        First sentence of every passage, plus the total sentence count
+    sentence_offsets: numpy.ndarray
+        First word of every sentence, plus the total word count
+    columns: dict
+        Attribute and word-level id array mapping, see `FIELDS`
+    governors: numpy.ndarray
+        Governor of every word
+    vocabularies: dict
+        Attribute and list of strings mapping
+    text_offsets: numpy.ndarray
+        Start of every passage text in `texts`, plus the total length
+    texts: numpy.ndarray
+        UTF-8 bytes of all passage texts
+    """
+    def __init__(self, passage_ids, passage_offsets, sentence_offsets, columns, governors,
+                 vocabularies, text_offsets, texts, sorted_ids=None, sorted_rows=None, cache_size=128):
+        self.passage_ids = passage_ids
+        if sorted_ids is None:
+            sorted_rows = np.argsort(passage_ids, kind="mergesort")
+            sorted_ids = passage_ids[sorted_rows]
+        self.sorted_ids = sorted_ids
+        self.sorted_rows = sorted_rows
+        self.passage_offsets = passage_offsets
+        self.sentence_offsets = sentence_offsets
+        self.columns = columns
+        self.governors = governors
+        self.vocabularies = vocabularies
+        self.text_offsets = text_offsets
+        self.texts = texts
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Build the store from annotated passages
+
+        Parameters
+        ----------
+        documents: dict
+            Passage ID and stanfordnlp.pipeline.doc.Document mapping
+
+        Returns
+        -------
+        AnnotationStore
+        """
+        lookups = {field: {} for field in FIELDS}
+        columns = {field: [] for field in FIELDS}
+        governors = []
+        sentence_offsets = [0]
+        passage_offsets = [0]
+        texts = []
+        text_offsets = [0]
+
+        for document in documents.values():
+            for sentence in document.sentences:
+                for word in sentence.words:
+                    for field in FIELDS:
+                        lookup = lookups[field]
+                        columns[field].append(lookup.setdefault(getattr(word, field), len(lookup)))
+                    governors.append(word.governor)
+                sentence_offsets.append(len(governors))
+            passage_offsets.append(len(sentence_offsets) - 1)
+            text = document.text.encode("utf-8")
+            texts.append(text)
+            text_offsets.append(text_offsets[-1] + len(text))
+
+        return cls(np.array(list(documents.keys()), dtype=np.int64),
+                   np.array(passage_offsets, dtype=np.int64),
+                   np.array(sentence_offsets, dtype=np.int64),
+                   {field: np.array(column, dtype=np.int32) for field, column in columns.items()},
+                   np.array(governors, dtype=np.int32),
+                   {field: list(lookup) for field, lookup in lookups.items()},
+                   np.array(text_offsets, dtype=np.int64),
+                   np.frombuffer(b"".join(texts), dtype=np.uint8))
+
+    def decode_words(self, start, end):
+        """Decode words `start` to `end` into `WordView`s
+
+        Parameters
+        ----------
+        start: int
+            First word of the sentence
+        end: int
+            End of the sentence
+
+        Returns
+        -------
+        list
+            list of WordView
+        """
+        decoded = [[self.vocabularies[field][i] for i in self.columns[field][start:end].tolist()]
+                   for field in FIELDS]
+        governors = self.governors[start:end].tolist()
+        return [WordView(str(i + 1), text, lemma, upos, feats, governor, relation)
+                for i, (text, lemma, upos, feats, relation, governor)
+                in enumerate(zip(*decoded, governors))]
+
+    def passage_text(self, row):
+        return bytes(self.texts[self.text_offsets[row]:self.text_offsets[row + 1]]).decode("utf-8")
+
+    def row(self, passage_id):
+        """Row of `passage_id`, -1 if the store does not have it"""
+        position = int(np.searchsorted(self.sorted_ids, passage_id))
+        if position < len(self.sorted_ids) and self.sorted_ids[position] == passage_id:
+            return int(self.sorted_rows[position])
+        return -1
+
+    def __getitem__(self, passage_id):
+        row = self.row(passage_id)
+        if row < 0:
+            raise KeyError(passage_id)
+
+        document = self._cache.get(row)
+        if document is not None:
+            self._cache.move_to_end(row)
+            return document
+
+        document = DocumentView(self, row)
+        if self.cache_size:
+            self._cache[row] = document
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return document
+
+    def __iter__(self):
+        return iter(self.passage_ids.tolist())
+
+    def __len__(self):
+        return len(self.passage_ids)
+
+    def __contains__(self, passage_id):
+        return self.row(passage_id) >= 0
+
+    def save(self, path):
+        """Save the store into directory `path`
+
+        Arrays are saved as .npy files and vocabularies as JSON, so loading
+        needs neither pickle nor stanfordnlp.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "passage_ids": self.passage_ids,
+            "sorted_ids": self.sorted_ids,
+            "sorted_rows": self.sorted_rows,
+            "passage_offsets": self.passage_offsets,
+            "sentence_offsets": self.sentence_offsets,
+            "governors": self.governors,
+            "text_offsets": self.text_offsets,
+            "texts": self.texts,
+        }
+        arrays.update({"column_" + field: column for field, column in self.columns.items()})
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), array)
+        with open(os.path.join(path, "vocabularies.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocabularies, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r", cache_size=128):
+        """Load a store saved with `save`
+
+        Parameters
+        ----------
+        path: str
+            Directory of the store
+        mmap_mode: str
+            Memory-map mode of the arrays, None reads them into memory
+        cache_size: int
+            Number of decoded passages kept
+
+        Returns
+        -------
+        AnnotationStore
+        """
+        def load_array(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode)
+
+        with open(os.path.join(path, "vocabularies.json"), encoding="utf-8") as f:
+            vocabularies = json.load(f)
+
+        return cls(load_array("passage_ids"),
+                   load_array("passage_offsets"),
+                   load_array("sentence_offsets"),
+                   {field: load_array("column_" + field) for field in FIELDS},
+                   load_array("governors"),
+                   vocabularies,
+                   load_array("text_offsets"),
+                   load_array("texts"),
+                   load_array("sorted_ids"),
+                   load_array("sorted_rows"),
+                   cache_size)
+
+
+def convert_pickle(pickle_path, store_path):
+    """Convert a pickle of annotated passages into an `AnnotationStore`
+
+    Parameters
+    ----------
+    pickle_path: str
+        Path of the Passage ID and stanfordnlp.pipeline.doc.Document pickle
+    store_path: str
+        Directory of the store
+    """
+    with open(pickle_path, "rb") as f:
+        documents = pickle.load(f)
+    AnnotationStore.from_documents(documents).save(store_path)
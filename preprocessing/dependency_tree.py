@@ -0,0 +1,92 @@
+class DependencyTree(object):
+    """Dependency Tree
+
+    Index of the dependency parse of a sentence, built once so that
+    lookups by governor and relation do not scan the words.
+
+    Attributes
+    ----------
+    root: int
+        Index of the first word governed by ROOT, 0 if there is none
+    children: dict
+        Governor and indices of its dependents mapping, in word order
+    relation_children: dict
+        (governor, relation) and indices of dependents mapping, in word order
+    """
+    def __init__(self, words):
+        self.root = 0
+        self.children = {}
+        self.relation_children = {}
+        for word in words:
+            index = int(word.index)
+            if word.governor == 0 and not self.root:
+                self.root = index
+            self.children.setdefault(word.governor, []).append(index)
+            self.relation_children.setdefault((word.governor, word.dependency_relation), []).append(index)
+
+    def dependents(self, governor, relation):
+        """Indices of words governed by `governor` with `relation`, a new list"""
+        if not isinstance(governor, int):
+            return []
+        return list(self.relation_children.get((governor, relation), []))
+
+    def first_dependent(self, governor, relation):
+        """Index of the first word governed by `governor` with `relation`, -1 if there is none"""
+        if not isinstance(governor, int):
+            return -1
+        dependents = self.relation_children.get((governor, relation))
+        return dependents[0] if dependents else -1
+
+    def descendants(self, idx):
+        """Words governed, transitively, by the words of `idx`
+
+        Words are in the order repeated scans over the sentence add them:
+        by scan, then by position. A word joins the scan of its governor if
+        it comes after it and the next scan otherwise.
+
+        Parameters
+        ----------
+        idx: list
+            List of indices
+
+        Returns
+        -------
+        list
+            Indices of descendants that are not in `idx`
+        """
+        initial = set(idx)
+        scans = {}
+        frontier = [index for index in initial]
+        while frontier:
+            next_frontier = []
+            for governor in frontier:
+                scan = scans.get(governor, 0)
+                for child in self.children.get(governor, []):
+                    if child in initial or child in scans:
+                        continue
+                    if governor in initial:
+                        scans[child] = 1
+                    else:
+                        scans[child] = scan + (1 if governor > child else 0)
+                    next_frontier.append(child)
+            frontier = next_frontier
+
+        return sorted(scans, key=lambda index: (scans[index], index))
+
+
+def dependency_tree(sentence):
+    """`DependencyTree` of `sentence`, built on first use and kept on it
+
+    Parameters
+    ----------
+    sentence: stanfordnlp.pipeline.doc.Sentence
+
+    Returns
+    -------
+    DependencyTree
+    """
+    tree = getattr(sentence, "_dependency_tree", None)
+    if tree is None:
+        tree = DependencyTree(sentence.words)
+        sentence._dependency_tree = tree
+    return tree
@@ -1,8 +1,205 @@
+import json
 import pickle
-import re
+import time
+from multiprocessing import Pool, cpu_count
 
 import stanfordnlp
-from .util import Answer, Question, QuestionGroup
+import torch
+from stanfordnlp.pipeline.doc import Document
+
+from .annotation_cache import AnnotationCache
+from .annotation_store import AnnotationStore
+from .sentence_features import attach_sentence_features
+from .reader import iter_passages, iter_question_groups
+
+
+def load_pipeline(lang):
+    """Build the stanfordnlp pipeline of `lang`, downloading models if needed"""
+    try:
+        return stanfordnlp.Pipeline(lang=lang)
+    except:
+        stanfordnlp.download(lang)
+        return stanfordnlp.Pipeline(lang=lang)
+
+
+BATCH_SEPARATOR = "\n\n"
+
+
+def _non_whitespace_length(text):
+    return len("".join(text.split()))
+
+
+def annotate_batch(nlp, texts):
+    """Annotate `texts` with a single pipeline call
+
+    Texts are joined with blank lines, which the tokenizer always treats
+    as sentence boundaries, and the sentences of the batch are mapped back
+    to texts by their non-whitespace character counts.
+
+    Parameters
+    ----------
+    nlp: stanfordnlp.pipeline.core.Pipeline
+        Pipeline object
+    texts: list
+        Texts without blank lines
+
+    Returns
+    -------
+    list
+        stanfordnlp.pipeline.doc.Document of every text,
+        None if the sentences cannot be mapped back
+    """
+    sentences = nlp(BATCH_SEPARATOR.join(texts)).sentences
+    documents = []
+    position = 0
+    for text in texts:
+        first = position
+        remaining = _non_whitespace_length(text)
+        while remaining > 0 and position < len(sentences):
+            remaining -= sum(_non_whitespace_length(token.text) for token in sentences[position].tokens)
+            position += 1
+        if remaining != 0:
+            return None
+        document = Document(text)
+        document.sentences = sentences[first:position]
+        documents.append(document)
+
+    return documents if position == len(sentences) else None
+
+
+def annotate_batched(nlp, items, batch_size=64):
+    """Annotate (key, text) pairs in length-bucketed batches
+
+    Texts are sorted by length and cut into batches of `batch_size`, so
+    the texts of a batch are about as long and the tagger and parser pad
+    little. A batch that cannot be mapped back is annotated text by text.
+
+    Parameters
+    ----------
+    nlp: stanfordnlp.pipeline.core.Pipeline
+        Pipeline object
+    items: list
+        (key, text) pairs, keys must be unique
+    batch_size: int
+        Number of texts annotated at once
+
+    Returns
+    -------
+    dict
+        key and stanfordnlp.pipeline.doc.Document mapping, in the order of `items`
+    """
+    order = sorted(range(len(items)), key=lambda i: len(items[i][1]))
+    annotated = {}
+    for start in range(0, len(order), batch_size):
+        batch = [items[i] for i in order[start:start + batch_size]]
+        texts = [text for _, text in batch]
+        documents = annotate_batch(nlp, texts)
+        if documents is None:
+            documents = [nlp(text) for text in texts]
+        annotated.update(zip((key for key, _ in batch), documents))
+
+    return {key: annotated[key] for key, _ in items}
+
+
+_worker_nlp = None
+_worker_batch_size = None
+
+
+def _init_annotation_worker(lang, batch_size=None, n_threads=1):
+    global _worker_nlp, _worker_batch_size
+    # Every worker would otherwise start a torch thread per core
+    torch.set_num_threads(n_threads)
+    _worker_nlp = load_pipeline(lang)
+    _worker_batch_size = batch_size
+
+
+def _annotate_shard(shard):
+    if _worker_batch_size:
+        return list(annotate_batched(_worker_nlp, shard, _worker_batch_size).items())
+    return [(key, _worker_nlp(text)) for key, text in shard]
+
+
+def annotate_parallel(items, lang, n_jobs=None, shard_size=16, batch_size=None, n_threads=1):
+    """Annotate texts over worker processes
+
+    Every worker builds its own pipeline and annotates shards of
+    `shard_size` texts, in batches of `batch_size` if it is given. Workers
+    run torch on `n_threads` threads each, so `n_jobs` workers do not
+    oversubscribe the cores.
+
+    Parameters
+    ----------
+    items: list
+        (key, text) pairs, keys must be unique
+    lang: str
+        Language of the worker pipelines
+    n_jobs: int
+        Number of worker processes; all cores when not given
+    shard_size: int
+        Number of texts sent to a worker at once
+    batch_size: int
+        Optional, number of texts a worker annotates at once, see `annotate_batched`
+    n_threads: int
+        Number of torch threads of every worker
+
+    Returns
+    -------
+    dict
+        key and stanfordnlp.pipeline.doc.Document mapping, in the order of `items`
+    """
+    n_jobs = n_jobs or cpu_count()
+    if batch_size:
+        shard_size = max(shard_size, batch_size)
+    shards = [items[i:i + shard_size] for i in range(0, len(items), shard_size)]
+
+    start = time.time()
+    annotated = {}
+    with Pool(n_jobs, initializer=_init_annotation_worker, initargs=(lang, batch_size, n_threads)) as pool:
+        for shard in pool.imap_unordered(_annotate_shard, shards):
+            annotated.update(shard)
+    elapsed = time.time() - start
+    print("Annotated {} docs with {} workers in {:.1f}s ({:.2f} docs/sec)".format(
+        len(items), n_jobs, elapsed, len(items) / elapsed if elapsed else float("inf")))
+
+    return {key: annotated[key] for key, _ in items}
+
+
+def benchmark_question_batching(question_answer_path, nlp, batch_size=64, encoding="utf-16"):
+    """Compare annotating the questions of soru_gruplari.txt one by one and batched
+
+    Parameters
+    ----------
+    question_answer_path: str
+        Path to question groups
+    nlp: stanfordnlp.pipeline.core.Pipeline
+        Pipeline object
+    batch_size: int
+        Number of questions annotated at once
+    encoding: str
+        Encoding type
+
+    Returns
+    -------
+    dict
+        Seconds of both modes and the speedup of batching
+    """
+    items = list(enumerate(question.text
+                           for qg in iter_question_groups(question_answer_path, encoding)
+                           for question in qg.questions))
+
+    start = time.time()
+    for _, text in items:
+        nlp(text)
+    single = time.time() - start
+
+    start = time.time()
+    annotate_batched(nlp, items, batch_size)
+    batched = time.time() - start
+
+    speedup = single / batched if batched else float("inf")
+    print("Annotated {} questions in {:.1f}s one by one, {:.1f}s in batches of {} ({:.2f}x)".format(
+        len(items), single, batched, batch_size, speedup))
+    return {"single": single, "batched": batched, "speedup": speedup}
 
 
 class StanfordNLPPreprocessor(object):
@@ -14,19 +211,88 @@ class StanfordNLPPreprocessor(object):
     ----------
     nlp: stanfordnlp.pipeline.core.Pipeline
         Pipeline object
+    lang: str
+        Language, used to build worker pipelines in parallel mode
+    cache: AnnotationCache
+        Optional, annotations reused by content hash in incremental mode
+    manifest: dict
+        Reused and annotated entries of the last parses in incremental mode
     """
-    def __init__(self, nlp=None, lang="tr"):
+    def __init__(self, nlp=None, lang="tr", cache_path=None):
+        self.lang = lang
         if nlp:
             self.nlp = nlp
         else:
-            try:
-                self.nlp = stanfordnlp.Pipeline(lang=lang)
-            except:
-                stanfordnlp.download(lang)
-                self.nlp = stanfordnlp.Pipeline(lang=lang)
+            self.nlp = load_pipeline(lang)
+        self.cache = AnnotationCache(cache_path, lang) if cache_path else None
+        self.manifest = {}
+
+    def annotate(self, items, n_jobs=1, reused=None, batch_size=None):
+        """Annotate (key, text) pairs
+
+        In incremental mode, texts found in `cache` are not annotated again
+        and new annotations are added to it.
+
+        Parameters
+        ----------
+        items: list
+            (key, text) pairs, keys must be unique
+        n_jobs: int
+            Number of worker processes; 1 annotates with `nlp` in this process,
+            None uses all cores
+        reused: list
+            Optional, keys whose annotation came from `cache` are appended to it
+        batch_size: int
+            Optional, texts are annotated in length-bucketed batches of
+            `batch_size` instead of one by one, see `annotate_batched`
+
+        Returns
+        -------
+        dict
+            key and stanfordnlp.pipeline.doc.Document mapping, in the order of `items`,
+            with the `DependencyTree` and `SentenceFeatures` of every sentence attached
+        """
+        cached = {}
+        if self.cache is not None:
+            for key, text in items:
+                document = self.cache.get(text)
+                if document is not None:
+                    cached[key] = document
+            if reused is not None:
+                reused.extend(cached)
+
+        missing = [(key, text) for key, text in items if key not in cached]
+        if n_jobs == 1 and batch_size:
+            annotated = annotate_batched(self.nlp, missing, batch_size)
+        elif n_jobs == 1:
+            annotated = {key: self.nlp(text) for key, text in missing}
+        else:
+            annotated = annotate_parallel(missing, self.lang, n_jobs, batch_size=batch_size) if missing else {}
+
+        if self.cache is not None:
+            for key, text in missing:
+                self.cache.put(text, annotated[key])
+
+        annotated.update(cached)
+        return {key: attach_sentence_features(annotated[key]) for key, _ in items}
+
+    def _record(self, name, keys, reused):
+        reused_keys = set(reused)
+        self.manifest[name] = {
+            "reused": [key for key in keys if key in reused_keys],
+            "annotated": [key for key in keys if key not in reused_keys],
+        }
+
+    def save_manifest(self, path):
+        """Save which entries of the last parses were reused or annotated as JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
 
     def read_data(self, passage_path, question_answer_path, encoding="utf-16"):
         """Reads dataset
+
+        Files are streamed by `parse_passage` and `parse_question_groups`
+        instead of being read here.
         
         Parameters
         ----------
@@ -37,64 +303,48 @@ class StanfordNLPPreprocessor(object):
         encoding: str
             Encoding type
         """
-        with open(passage_path, "rb") as f:
-            self.passage_plain = f.read().decode(encoding)
-        with open(question_answer_path, "rb") as f:
-            self.question_groups_plain = f.read().decode(encoding)
+        self.passage_path = passage_path
+        self.question_answer_path = question_answer_path
+        self.encoding = encoding
 
-    def parse_passage(self, sep="\r\n\r\n"):
+    def parse_passage(self, sep="\r\n\r\n", n_jobs=1):
         """Parse Passages
 
         Parameters
         ----------
         sep: str
             Separator for passages
+        n_jobs: int
+            Number of annotation processes, see `annotate`
         """
-        passages = self.passage_plain.split(sep)
-        pattern = re.compile(r"^\d+")
-        self.passage_dict = {
-            int(pattern.match(passage).group()): self.nlp(passage[pattern.match(passage).end() + 1:].strip())
-            for passage in passages
-        }
+        items = list(dict(iter_passages(self.passage_path, self.encoding, sep)).items())
+        reused = []
+        self.passage_dict = self.annotate(items, n_jobs, reused)
+        if self.cache is not None:
+            self._record("passages", [key for key, _ in items], reused)
 
-    def parse_question_groups(self, sep="\r\n\r\n"):
+    def parse_question_groups(self, sep="\r\n\r\n", n_jobs=1, batch_size=None):
         """Parse Question Groups
 
         Parameters
         ----------
         sep: str
             Separator for question groups
+        n_jobs: int
+            Number of annotation processes, see `annotate`
+        batch_size: int
+            Optional, number of questions annotated at once, see `annotate`
         """
-        question_groups_raw = self.question_groups_plain.split(sep)
-        q_pat = re.compile(r"^S\d+:")
-        a_pat = re.compile(r"^C\d+:")
-        rel_pat = re.compile(r"^İlintili Paragraf:")
-
-        self.question_groups = []
-
-        for question_group_raw in question_groups_raw:
-            questions = []
-            answer = None
-            rel_par = None
-            for line in question_group_raw.strip().splitlines():
-                line = line.strip()
-                if not line:
-                    continue
-                if q_pat.match(line):
-                    idx = q_pat.match(line).group()[:-1]
-                    text = self.nlp(line[q_pat.match(line).end() + 1:])
-                    questions.append(Question(idx, text))
-                elif a_pat.match(line):
-                    idx = a_pat.match(line).group()[:-1]
-                    text = line[a_pat.match(line).end() + 1:]
-                    answer = Answer(idx, text)
-                elif rel_pat.match(line):
-                    rel_par = int(line[rel_pat.match(line).end() + 1:])
-                else:
-                    print("Unsupported line: {}: Raw: {}".format(line, question_group_raw))
-            self.question_groups.append(
-                QuestionGroup(questions, answer, rel_par)
-            )
+        self.question_groups = list(iter_question_groups(self.question_answer_path, self.encoding, sep))
+
+        questions = [question for qg in self.question_groups for question in qg.questions]
+        reused = []
+        parsed = self.annotate(list(enumerate(question.text for question in questions)), n_jobs, reused, batch_size)
+        for i, question in enumerate(questions):
+            question.text = parsed[i]
+        if self.cache is not None:
+            self._record("questions", [question.idx for question in questions],
+                         [questions[i].idx for i in reused])
 
     def save_preprocessed_data(self, passages_path, question_groups_path):
         with open(passages_path, "wb") as f:
@@ -103,6 +353,10 @@ class StanfordNLPPreprocessor(object):
         with open(question_groups_path, "wb") as f:
             pickle.dump(self.question_groups, f)
 
+    def save_annotation_store(self, path):
+        """Save annotated passages as an `AnnotationStore` directory"""
+        AnnotationStore.from_documents(self.passage_dict).save(path)
+
 
 class Preprocessor(object):
     """Preproces Class"""
@@ -111,8 +365,8 @@ class Preprocessor(object):
         self.passages_path = passages_path
 
     def read_passages(self, encoding="utf-16"):
-        with open(self.passages_path, "r", encoding=encoding) as f:
-            self.passage_plain = f.read()
+        """Set the encoding of the passages file, which `parse_passages` streams"""
+        self.encoding = encoding
 
     def parse_passages(self, sep="\r\n\r\n"):
         """Parse Passages
@@ -122,12 +376,7 @@ class Preprocessor(object):
         sep: str
             Separator for passages
         """
-        passages = self.passage_plain.split(sep)
-        pattern = re.compile(r"^\d+")
-        self.passage_dict = {
-            int(pattern.match(passage).group()): passage[pattern.match(passage).end() + 1:].strip()
-            for passage in passages
-        }
+        self.passage_dict = dict(iter_passages(self.passages_path, self.encoding, sep))
 
     def save_passages(self, path):
         with open(path, "wb") as f:
@@ -0,0 +1,139 @@
+import re
+
+from .util import Answer, Question, QuestionGroup
+
+PASSAGE_PATTERN = re.compile(r"^\d+")
+QUESTION_PATTERN = re.compile(r"^S\d+:")
+ANSWER_PATTERN = re.compile(r"^C\d+:")
+RELATED_PASSAGE_PATTERN = re.compile(r"^İlintili Paragraf:")
+
+
+def iter_records(path, encoding="utf-16", sep="\r\n\r\n", chunk_size=1 << 16):
+    """Yield `sep` separated records of a file
+
+    The file is decoded incrementally, so only the current chunk and
+    record are in memory. Records are the same as `text.split(sep)`.
+
+    Parameters
+    ----------
+    path: str
+        Path of the file
+    encoding: str
+        Encoding type
+    sep: str
+        Separator for records
+    chunk_size: int
+        Number of characters decoded at once
+
+    Yields
+    ------
+    str
+        Record
+    """
+    with open(path, "r", encoding=encoding, newline="") as f:
+        buffer = ""
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer += chunk
+            records = buffer.split(sep)
+            buffer = records.pop()
+            for record in records:
+                yield record
+        yield buffer
+
+
+def parse_passage_record(record):
+    """Parse `<passage id> <text>` record
+
+    Parameters
+    ----------
+    record: str
+
+    Returns
+    -------
+    tuple
+        passage ID, text
+    """
+    match = PASSAGE_PATTERN.match(record)
+    return int(match.group()), record[match.end() + 1:].strip()
+
+
+def iter_passages(path, encoding="utf-16", sep="\r\n\r\n"):
+    """Yield (passage ID, text) of every passage of derlem.txt
+
+    Parameters
+    ----------
+    path: str
+        Path to Paragraphs
+    encoding: str
+        Encoding type
+    sep: str
+        Separator for passages
+
+    Yields
+    ------
+    tuple
+        passage ID, text
+    """
+    for record in iter_records(path, encoding, sep):
+        if record.strip():
+            yield parse_passage_record(record)
+
+
+def parse_question_group_record(record):
+    """Parse a question group record
+
+    Lines are `S<n>: <question>`, `C<n>: <answer>` and
+    `İlintili Paragraf: <passage id>`; questions are kept as plain text.
+
+    Parameters
+    ----------
+    record: str
+
+    Returns
+    -------
+    QuestionGroup
+    """
+    questions = []
+    answer = None
+    rel_par = None
+    for line in record.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if QUESTION_PATTERN.match(line):
+            idx = QUESTION_PATTERN.match(line).group()[:-1]
+            text = line[QUESTION_PATTERN.match(line).end() + 1:]
+            questions.append(Question(idx, text))
+        elif ANSWER_PATTERN.match(line):
+            idx = ANSWER_PATTERN.match(line).group()[:-1]
+            text = line[ANSWER_PATTERN.match(line).end() + 1:]
+            answer = Answer(idx, text)
+        elif RELATED_PASSAGE_PATTERN.match(line):
+            rel_par = int(line[RELATED_PASSAGE_PATTERN.match(line).end() + 1:])
+        else:
+            print("Unsupported line: {}: Raw: {}".format(line, record))
+    return QuestionGroup(questions, answer, rel_par)
+
+
+def iter_question_groups(path, encoding="utf-16", sep="\r\n\r\n"):
+    """Yield every question group of soru_gruplari.txt
+
+    Parameters
+    ----------
+    path: str
+        Path to question groups
+    encoding: str
+        Encoding type
+    sep: str
+        Separator for question groups
+
+    Yields
+    ------
+    QuestionGroup
+        Question groups with plain text questions
+    """
+    for record in iter_records(path, encoding, sep):
+        yield parse_question_group_record(record)
@@ -0,0 +1,105 @@
+import sys
+import zlib
+from collections import Counter
+
+from .dependency_tree import dependency_tree
+
+SIGNATURE_BITS = 256
+
+
+def lemma_bit(lemma, bits=SIGNATURE_BITS):
+    """Bit of `lemma` in lemma signatures
+
+    crc32 is used instead of `hash`, which is salted per process, so
+    signatures stay valid after pickling.
+    """
+    return 1 << (zlib.crc32(lemma.encode("utf-8")) % bits)
+
+
+def lemma_signature(lemmas, bits=SIGNATURE_BITS):
+    """Hashed bitset of `lemmas` as an int, None lemmas are skipped
+
+    Two signatures that share no bit share no lemma.
+    """
+    signature = 0
+    for lemma in lemmas:
+        if isinstance(lemma, str):
+            signature |= lemma_bit(lemma, bits)
+    return signature
+
+
+class SentenceFeatures(object):
+    """Sentence Features
+
+    Question independent data of a sentence that answer extraction reads
+    for every question. Strings are interned, so equal strings of
+    different sentences are the same object.
+
+    Attributes
+    ----------
+    bigrams: list
+        (dependent, relation, head) triples, see `answer_extraction.util.construct_bigrams`
+    dependents: collections.Counter
+        Counts of the dependents of `bigrams`
+    heads: collections.Counter
+        Counts of the heads of `bigrams`
+    lemmas: frozenset
+        Lemmas of the words
+    lemma_signature: int
+        Hashed bitset of `lemmas`, see `lemma_signature`
+    casefolded: tuple
+        Casefolded text of every word
+    root: int
+        Index of the root, 0 if there is none
+    subjects: tuple
+        Indices of the `nsubj` dependents of the root
+    punct: tuple
+        Whether every word is punctuation
+    number: tuple
+        Whether every word is a number
+    """
+    def __init__(self, sentence):
+        words = sentence.words
+        intern = sys.intern
+        word_list = [intern(word.text) for word in words]
+        word_list.insert(0, "ROOT")
+        self.bigrams = [
+            (word_list[int(word.index)], intern(word.dependency_relation), word_list[word.governor])
+            for word in words
+        ]
+        self.dependents = Counter(dep for dep, _, _ in self.bigrams)
+        self.heads = Counter(head for _, _, head in self.bigrams)
+        self.lemmas = frozenset(intern(word.lemma) if isinstance(word.lemma, str) else word.lemma for word in words)
+        self.lemma_signature = lemma_signature(self.lemmas)
+        self.casefolded = tuple(intern(word.text.casefold()) for word in words)
+
+        tree = dependency_tree(sentence)
+        self.root = tree.root
+        self.subjects = tuple(tree.dependents(tree.root, "nsubj")) if tree.root > 0 else ()
+        self.punct = tuple(word.upos == "PUNCT" for word in words)
+        self.number = tuple(word.upos == "NUM" for word in words)
+
+
+def sentence_features(sentence):
+    """`SentenceFeatures` of `sentence`, built on first use and kept on it
+
+    Parameters
+    ----------
+    sentence: stanfordnlp.pipeline.doc.Sentence
+
+    Returns
+    -------
+    SentenceFeatures
+    """
+    features = getattr(sentence, "_features", None)
+    if features is None:
+        features = SentenceFeatures(sentence)
+        sentence._features = features
+    return features
+
+
+def attach_sentence_features(document):
+    """Build the `DependencyTree` and `SentenceFeatures` of every sentence of `document`"""
+    for sentence in document.sentences:
+        sentence_features(sentence)
+    return document
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+class Word(object):
+    """Stub of stanfordnlp.pipeline.doc.Word, the lemma is the text unless given"""
+    def __init__(self, index, governor, dependency_relation, text, lemma=None, upos="NOUN"):
+        self.index = str(index)
+        self.governor = governor
+        self.dependency_relation = dependency_relation
+        self.text = text
+        self.lemma = text if lemma is None else lemma
+        self.upos = upos
+
+
+class Sentence(object):
+    """Stub of stanfordnlp.pipeline.doc.Sentence"""
+    def __init__(self, words):
+        self.words = words
+        self.dependencies = [(words[word.governor - 1] if 0 < word.governor <= len(words) else None,
+                              word.dependency_relation, word) for word in words]
+
+
+class Document(object):
+    """Stub of stanfordnlp.pipeline.doc.Document"""
+    def __init__(self, sentences):
+        self.sentences = sentences
+        self.text = " ".join(word.text for sentence in sentences for word in sentence.words)
+
+
+def random_sentence(rng, n_words, texts, relations=("nsubj", "obj", "amod"), lemmas=None):
+    """Sentence of `n_words` random words with random governors
+
+    Lemmas are drawn from `lemmas` independently of the texts if it is given.
+    """
+    return Sentence([Word(i, rng.randint(0, n_words), rng.choice(relations), rng.choice(texts),
+                          rng.choice(lemmas) if lemmas else None)
+                     for i in range(1, n_words + 1)])
@@ -0,0 +1,117 @@
+import random
+
+import pytest
+
+import answer_extraction.answer_extraction as answer_extraction
+from answer_extraction.answer_extraction import find_answer_topk
+from answer_extraction.compiled_question import CompiledQuestion
+from answer_extraction.parse_cache import QuestionParseCache
+from answer_extraction.util import calculate_focus_score, calculate_tree_similarity
+
+from conftest import Document, Sentence, Word, random_sentence
+
+
+@pytest.fixture(autouse=True)
+def sentence_answers(monkeypatch):
+    # The answer is the picked sentence itself, so tests see which one won
+    monkeypatch.setattr(answer_extraction, "get_answer", lambda q_type, sentence, parsed_question: sentence)
+
+
+def parse_cache(question):
+    # Questions are parsed from the cache, without stanfordnlp
+    cache = QuestionParseCache()
+    cache.parse(question.text, lambda text: question)
+    return cache
+
+
+def reference_topk(question, passage_ids, retrieval_scores, passages, retrieval_weight):
+    # Every sentence of every passage scored one by one, the first one wins ties
+    compiled = CompiledQuestion(question)
+    low, high = min(retrieval_scores), max(retrieval_scores)
+    best_sentence, best_score = None, None
+    for passage_id, retrieval_score in zip(passage_ids, retrieval_scores):
+        normalized = 1. if high == low else (retrieval_score - low) / (high - low)
+        for sentence in passages[passage_id].sentences:
+            overall = 0.8 * calculate_tree_similarity(sentence, compiled) \
+                + 0.2 * calculate_focus_score(sentence, compiled.focus)
+            score = (1 - retrieval_weight) * overall + retrieval_weight * normalized
+            if best_score is None or score > best_score:
+                best_sentence, best_score = sentence, score
+    return best_sentence, best_score
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("prune", [True, False])
+def test_matches_per_passage_reference(seed, prune):
+    rng = random.Random(seed)
+    for _ in range(100):
+        vocabulary = ["w{}".format(i) for i in range(rng.choice([3, 20]))]
+        question = Document([random_sentence(rng, rng.randint(1, 8), vocabulary)])
+        passage_ids = rng.sample(range(100), rng.randint(1, 6))
+        passages = {passage_id: Document([random_sentence(rng, rng.randint(1, 12), vocabulary)
+                                          for _ in range(rng.randint(0, 5))])
+                    for passage_id in passage_ids}
+        if not any(passage.sentences for passage in passages.values()):
+            continue
+        retrieval_scores = [rng.choice([0.1, 0.5, rng.random()]) for _ in passage_ids]
+        retrieval_weight = rng.choice([0., 0.3, 0.5, 1.])
+
+        expected = reference_topk(question, passage_ids, retrieval_scores, passages, retrieval_weight)
+        answer, score = find_answer_topk(question.text, passage_ids, retrieval_scores, passages,
+                                         parse_cache(question), retrieval_weight, prune)
+        assert answer is expected[0]
+        assert score == pytest.approx(expected[1])
+
+
+def matching_passages():
+    # Passage 1 repeats the question, passage 2 shares no word with it
+    question = Document([Sentence([Word(1, 0, "root", "a"), Word(2, 1, "obj", "b")])])
+    passages = {1: Document([Sentence([Word(1, 0, "root", "a"), Word(2, 1, "obj", "b")])]),
+                2: Document([Sentence([Word(1, 0, "root", "c"), Word(2, 1, "obj", "d")])])}
+    return question, passages
+
+
+def test_retrieval_weight_moves_pick():
+    question, passages = matching_passages()
+    cache = parse_cache(question)
+    answer, score = find_answer_topk(question.text, [1, 2], [0.2, 0.9], passages, cache, retrieval_weight=0.)
+    assert answer is passages[1].sentences[0]
+    answer, score = find_answer_topk(question.text, [1, 2], [0.2, 0.9], passages, cache, retrieval_weight=1.)
+    assert answer is passages[2].sentences[0]
+    assert score == 1.
+
+
+def test_returns_fused_score():
+    question, passages = matching_passages()
+    compiled = CompiledQuestion(question)
+    sentence = passages[1].sentences[0]
+    overall = 0.8 * calculate_tree_similarity(sentence, compiled) + 0.2 * calculate_focus_score(sentence, compiled.focus)
+    answer, score = find_answer_topk(question.text, [2, 1], [0.9, 0.2], passages, parse_cache(question),
+                                     retrieval_weight=0.25)
+    assert answer is sentence
+    assert score == pytest.approx(0.75 * overall + 0.25 * 0.)
+
+
+@pytest.mark.parametrize("prune", [True, False])
+def test_ties_pick_first_passage(prune):
+    question, passages = matching_passages()
+    words = passages[1].sentences[0].words
+    passages = {3: Document([Sentence(words)]), 4: Document([Sentence(words)])}
+    for passage_ids in ([3, 4], [4, 3]):
+        answer, _ = find_answer_topk(question.text, passage_ids, [0.5, 0.5], passages, parse_cache(question),
+                                     prune=prune)
+        assert answer is passages[passage_ids[0]].sentences[0]
+
+
+def test_no_passages():
+    assert find_answer_topk("Soru?", [], [], {}) == (None, 0.)
+
+
+def test_passages_without_sentences():
+    passages = {1: Document([]), 2: Document([])}
+    assert find_answer_topk("Soru?", [1, 2], [0.5, 0.2], passages) == (None, 0.)
+
+
+def test_length_mismatch():
+    with pytest.raises(ValueError):
+        find_answer_topk("Soru?", [1, 2], [0.5], {1: Document([]), 2: Document([])})
@@ -0,0 +1,26 @@
+from answer_extraction.parse_cache import QuestionParseCache
+
+
+def fail_to_load():
+    raise AssertionError("pipeline loaded on a cache hit")
+
+
+def test_hit_does_not_load_pipeline():
+    cache = QuestionParseCache()
+    parsed = object()
+    assert cache.parse("Soru  nedir?", lambda text: parsed) is parsed
+    assert cache.parse("Soru nedir?", load_pipeline=fail_to_load) is parsed
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_miss_loads_pipeline_once():
+    cache = QuestionParseCache()
+    loads = []
+
+    def load_pipeline():
+        loads.append(1)
+        return lambda text: text.upper()
+
+    assert cache.parse("soru", load_pipeline=load_pipeline) == "SORU"
+    assert cache.parse("soru", load_pipeline=fail_to_load) == "SORU"
+    assert len(loads) == 1
@@ -0,0 +1,30 @@
+import os
+
+from passage_retrieval.retrieval_index import RetrievalIndex, load_or_build_index
+from passage_retrieval.supervised_xgboost import default_index
+
+PASSAGES = {1: "ankara türkiye başkenti", 2: "istanbul büyük bir şehir", 3: "izmir ege kıyısında"}
+
+
+def test_rebuilds_corrupt_pickle(tmp_path):
+    file_path = str(tmp_path / "index.pickle")
+    with open(file_path, "wb") as f:
+        f.write(b"not a pickle")
+    index = load_or_build_index(file_path, PASSAGES)
+    assert index.matches(PASSAGES)
+    assert RetrievalIndex.load(file_path).matches(PASSAGES)
+
+
+def test_unsaved_index_is_returned(tmp_path):
+    file_path = str(tmp_path / "missing" / "index.pickle")
+    index = load_or_build_index(file_path, PASSAGES)
+    assert index.matches(PASSAGES)
+    assert not os.path.exists(file_path)
+
+
+def test_default_index_follows_changed_passages(tmp_path):
+    file_path = str(tmp_path / "index.pickle")
+    passages = dict(PASSAGES)
+    assert default_index(passages, file_path).search(["ankara"], 1)[0].tolist() == [[1]]
+    passages[4] = "ankara ankara ankara"
+    assert default_index(passages, file_path).search(["ankara"], 1)[0].tolist() == [[4]]
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from answer_extraction.answer_extraction import pruning_stats, reset_pruning_stats, select_sentence
+
+from conftest import Document, Sentence, random_sentence
+
+
+def copy_passage(passage):
+    # New sentence objects, so cached features of one run do not leak into the other
+    return Document([Sentence(sentence.words) for sentence in passage.sentences])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pruned_matches_exhaustive(seed):
+    rng = random.Random(seed)
+    reset_pruning_stats()
+    for _ in range(500):
+        vocabulary = ["w{}".format(i) for i in range(rng.choice([3, 20, 200]))]
+        question = Document([random_sentence(rng, rng.randint(1, 8), vocabulary, "abc", vocabulary)])
+        focus = " ".join(rng.sample(vocabulary, min(2, len(vocabulary))))
+        sentences = [random_sentence(rng, rng.randint(1, 20), vocabulary, "abc", vocabulary) for _ in range(rng.randint(1, 12))]
+        # Repeated sentences tie, the first one has to win
+        sentences += [Sentence(rng.choice(sentences).words) for _ in range(rng.randint(0, 3))]
+        rng.shuffle(sentences)
+        passage = Document(sentences)
+
+        exhaustive = select_sentence(copy_passage(passage), focus, question, prune=False)
+        assert select_sentence(copy_passage(passage), focus, question, prune=True) == exhaustive
+
+    assert pruning_stats["sentences"] == pruning_stats["scored"] + pruning_stats["pruned"]
+    assert pruning_stats["pruned"] > 0
+
+
+def test_ties_pick_first_sentence():
+    rng = random.Random(0)
+    vocabulary = ["a", "b"]
+    question = Document([random_sentence(rng, 4, vocabulary, "abc", vocabulary)])
+    sentence = random_sentence(rng, 6, vocabulary, "abc", vocabulary)
+    passage = Document([Sentence(sentence.words) for _ in range(5)])
+    assert select_sentence(passage, "a", question, prune=True) == 0
+    assert select_sentence(copy_passage(passage), "a", question, prune=False) == 0
+
+
+def test_stats_add_up():
+    rng = random.Random(1)
+    vocabulary = ["w{}".format(i) for i in range(50)]
+    reset_pruning_stats()
+    for _ in range(100):
+        question = Document([random_sentence(rng, 6, vocabulary, "abc", vocabulary)])
+        passage = Document([random_sentence(rng, 15, vocabulary, "abc", vocabulary) for _ in range(10)])
+        select_sentence(passage, "w1 w2", question, prune=True)
+    assert pruning_stats["sentences"] == 1000
+    assert pruning_stats["sentences"] == pruning_stats["scored"] + pruning_stats["pruned"]
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from passage_retrieval.tree_ensemble import TreeEnsemble
+
+xgb = pytest.importorskip("xgboost")
+
+
+def training_data(seed=0, n_rows=400, n_features=6):
+    rng = np.random.RandomState(seed)
+    X = rng.rand(n_rows, n_features).astype(np.float32)
+    y = X[:, 0] + 0.5 * X[:, 1] - X[:, 2] * X[:, 3]
+    X[rng.rand(n_rows, n_features) < 0.15] = np.nan
+    return X, y
+
+
+def test_squarederror_matches_predict(tmp_path):
+    X, y = training_data()
+    model = xgb.XGBRegressor(n_estimators=30, max_depth=4, objective="reg:squarederror")
+    model.fit(X, y)
+
+    ensemble = TreeEnsemble.from_xgb_model(model)
+    expected = model.predict(X)
+    np.testing.assert_allclose(ensemble.predict(X), expected, rtol=0, atol=1e-6)
+
+    ensemble.save(str(tmp_path / "trees.npz"))
+    loaded = TreeEnsemble.load(str(tmp_path / "trees.npz"))
+    np.testing.assert_array_equal(loaded.predict(X), ensemble.predict(X))
+
+
+def test_logistic_matches_predict_proba(tmp_path):
+    X, y = training_data(1)
+    labels = (y > np.median(y)).astype(int)
+    model = xgb.XGBClassifier(n_estimators=30, max_depth=4, objective="binary:logistic")
+    model.fit(X, labels)
+
+    ensemble = TreeEnsemble.from_xgb_model(model)
+    expected = model.predict_proba(X)[:, 1]
+    np.testing.assert_allclose(ensemble.predict(X), expected, rtol=0, atol=1e-6)
+
+    ensemble.save(str(tmp_path / "trees.npz"))
+    loaded = TreeEnsemble.load(str(tmp_path / "trees.npz"))
+    np.testing.assert_array_equal(loaded.predict(X), ensemble.predict(X))
+
+
+def test_reg_logistic_matches_predict():
+    X, y = training_data(2)
+    target = (y - y.min()) / (y.max() - y.min())
+    model = xgb.XGBRegressor(n_estimators=20, max_depth=3, objective="reg:logistic")
+    model.fit(X, target)
+
+    ensemble = TreeEnsemble.from_xgb_model(model)
+    np.testing.assert_allclose(ensemble.predict(X), model.predict(X), rtol=0, atol=1e-6)
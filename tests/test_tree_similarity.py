@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from answer_extraction.util import calculate_tree_similarity, construct_bigrams
+
+from conftest import Document, Sentence, Word, random_sentence
+
+
+def reference_tree_similarity(sentence, parsed_question, theta=2):
+    # Nested-loop sum of `sim` over every bigram pair, as before the count tables
+    def s(a, b):
+        return 1 if a == b else 0
+
+    def q(a, b):
+        return theta if a == b else 1
+
+    sent_bigrams = construct_bigrams(sentence.words)
+    quest_bigrams = construct_bigrams(parsed_question.sentences[0].words)
+    score = 0
+    for dep_1, type_1, head_1 in sent_bigrams:
+        for dep_2, type_2, head_2 in quest_bigrams:
+            score += (s(dep_1, dep_2) + s(head_1, head_2)) * q(type_1, type_2)
+    return score / (len(sent_bigrams) + len(quest_bigrams))
+
+
+TEXTS = ("a", "b", "c", "ROOT")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_nested_loop(seed):
+    rng = random.Random(seed)
+    for _ in range(2000):
+        question = Document([random_sentence(rng, rng.randint(1, 8), TEXTS)])
+        sentence = random_sentence(rng, rng.randint(0, 12), TEXTS)
+        assert calculate_tree_similarity(sentence, question) == reference_tree_similarity(sentence, question)
+
+
+def test_empty_sentence():
+    question = Document([Sentence([Word(1, 0, "root", "a"), Word(2, 1, "obj", "b")])])
+    sentence = Sentence([])
+    assert calculate_tree_similarity(sentence, question) == reference_tree_similarity(sentence, question) == 0
+
+
+def test_root_text():
+    # A word whose text is ROOT matches the head of the root bigram
+    question = Document([Sentence([Word(1, 0, "root", "ROOT"), Word(2, 1, "nsubj", "a")])])
+    sentence = Sentence([Word(1, 0, "root", "a"), Word(2, 1, "nsubj", "ROOT"), Word(3, 0, "root", "ROOT")])
+    expected = reference_tree_similarity(sentence, question)
+    assert expected > 0
+    assert calculate_tree_similarity(sentence, question) == expected